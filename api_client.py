@@ -1,10 +1,16 @@
 """API helper functions for the RankAndReasoning Lambda."""
 
-from typing import Any, Dict, Iterable, Optional, Sequence
-
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Sequence, Tuple
+
+import orjson
 import requests
 
-from config import DATA_API_BASE_URL, DATA_API_KEY, DATA_API_TIMEOUT
+from config import DATA_API_BASE_URL, DATA_API_KEY, DATA_API_SEARCH_PROJECTION, DATA_API_TIMEOUT
 from logging_config import setup_logger
 
 logger = setup_logger(__name__)
@@ -37,18 +43,29 @@ def _user_params(user_id: str) -> Dict[str, str]:
     return {"userId": str(user_id)}
 
 
-def get_search_document(search_id: str, *, user_id: str) -> Optional[Dict[str, Any]]:
+def get_search_document(
+    search_id: str,
+    *,
+    user_id: str,
+    projection: Optional[Dict[str, int]] = None,
+) -> Optional[Dict[str, Any]]:
     """
     Load the search document referenced by ``search_id``.
 
-    Input: identifier string. Output: dict when found, otherwise ``None``.
+    Input: identifier string plus optional projection dict limiting the returned fields. The
+    projection is only sent when SEARCH_API_PROJECTION is enabled for a data API that honours
+    it; otherwise it is ignored and the full document is returned.
+    Output: dict when found, otherwise ``None``.
     """
     url = f"{DATA_API_BASE_URL}/search/{search_id}"
+    params = _user_params(user_id)
+    if projection and DATA_API_SEARCH_PROJECTION:
+        params["projection"] = json.dumps(projection)
     try:
         response = requests.get(
             url,
             headers=_headers(),
-            params=_user_params(user_id),
+            params=params,
             timeout=DATA_API_TIMEOUT,
         )
     except requests.RequestException as exc:  # pragma: no cover
@@ -168,6 +185,91 @@ def fetch_nodes_by_ids(
     return {}
 
 
+# Node documents change rarely relative to a warm container's lifetime; cache bulk fetches
+# briefly so candidates recurring across batches and searches are not re-downloaded. Entries
+# are kept as orjson bytes: far smaller than the decoded dicts, and every hit decodes a fresh
+# copy that callers may modify freely. The cache is bounded by bytes, a tenth of the function's
+# memory, rather than by entry count, since profile documents vary widely in size.
+NODE_CACHE_TTL_SECONDS = 300
+NODE_CACHE_MAX_BYTES = int(os.environ.get("AWS_LAMBDA_FUNCTION_MEMORY_SIZE") or 1024) * 1024 * 1024 // 10
+
+
+class _NodeDocumentCache:
+    """Thread-safe LRU cache of serialized node documents with a per-entry TTL."""
+
+    def __init__(self, max_bytes: int, ttl_seconds: float):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple[str, Tuple[Tuple[str, int], ...]], Tuple[float, bytes]]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[str, Tuple[Tuple[str, int], ...]]) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, payload = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self._size -= len(payload)
+                return None
+            self._entries.move_to_end(key)
+        return orjson.loads(payload)
+
+    def put(self, key: Tuple[str, Tuple[Tuple[str, int], ...]], doc: Dict[str, Any]) -> None:
+        payload = orjson.dumps(doc)
+        if len(payload) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous[1])
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, payload)
+            self._size += len(payload)
+            while self._size > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+
+_node_cache = _NodeDocumentCache(NODE_CACHE_MAX_BYTES, NODE_CACHE_TTL_SECONDS)
+
+
+def fetch_nodes_by_ids_cached(
+    node_ids: Iterable[str],
+    *,
+    projection: Optional[Dict[str, int]] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    ``fetch_nodes_by_ids`` backed by a short-lived per-container cache.
+
+    Input/output match ``fetch_nodes_by_ids``; only ids missing from the cache for this
+    projection are requested. Returned documents are independent copies safe to modify.
+    Unprojected reads return whole documents and bypass the cache.
+    """
+    if not projection:
+        return fetch_nodes_by_ids(node_ids)
+
+    projection_key = tuple(sorted(projection.items()))
+    results: Dict[str, Dict[str, Any]] = {}
+    to_fetch = []
+    for node_id in dict.fromkeys(str(node_id) for node_id in node_ids if node_id):
+        doc = _node_cache.get((node_id, projection_key))
+        if doc is None:
+            to_fetch.append(node_id)
+        else:
+            results[node_id] = doc
+
+    if to_fetch:
+        fetched = fetch_nodes_by_ids(to_fetch, projection=projection)
+        for key, doc in fetched.items():
+            if not key or not isinstance(doc, dict):
+                continue
+            _node_cache.put((str(key), projection_key), doc)
+            results[str(key)] = doc
+    return results
+
+
 def get_node_document(node_id: str, *, projection: Optional[Dict[str, int]] = None) -> Optional[Dict[str, Any]]:
     """
     Convenience helper to resolve a single node document.
@@ -3,13 +3,30 @@
 import os
 from typing import Any, Optional
 
-# Load .env file for local development only (not needed in Lambda)
-try:
-    from dotenv import load_dotenv
+_dotenv_loaded = False
+
+
+def load_local_env() -> None:
+    """Load the .env file once per process, for local development only.
+
+    Lambda already exports the variables, so the file lookup and parse are skipped there
+    (set LOAD_DOTENV=1 to force it).
+    """
+    global _dotenv_loaded
+    if _dotenv_loaded:
+        return
+    _dotenv_loaded = True
+    if os.environ.get("AWS_LAMBDA_FUNCTION_NAME") and os.environ.get("LOAD_DOTENV") != "1":
+        return
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        # dotenv not available in Lambda environment, which is fine
+        return
     load_dotenv()
-except ImportError:
-    # dotenv not available in Lambda environment, which is fine
-    pass
+
+
+load_local_env()
 
 
 def get_env_var(var_name: str, required: bool = True) -> Optional[str]:
@@ -24,4 +41,6 @@ def get_env_var(var_name: str, required: bool = True) -> Optional[str]:
 DATA_API_BASE_URL = get_env_var("BASE_URL")
 DATA_API_KEY = get_env_var("ADMIN_KEY", required=False)
 DATA_API_TIMEOUT = float(get_env_var("SEARCH_API_TIMEOUT", required=False) or 10)
-
+# GET /search/{id} only trims its response when the deployed data API supports the
+# ``projection`` query parameter; off by default so the full document is requested
+DATA_API_SEARCH_PROJECTION = (get_env_var("SEARCH_API_PROJECTION", required=False) or "").lower() in ("1", "true")
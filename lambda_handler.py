@@ -1,25 +1,28 @@
 import json
 import asyncio
 import os
+import time
 import traceback
 from copy import deepcopy
 from datetime import datetime, timezone
 from typing import Dict, List
-from dotenv import load_dotenv
-from reasoning_logic import SearchReasoning
+import orjson
 from logging_config import setup_logger
 from api_client import (
     get_search_document,
     update_search_document,
     SearchServiceError,
 )
-from ranking import build_candidate_materials, process_people_direct, convert_objectids_to_strings
-
-# Load environment variables (for local testing)
-load_dotenv()
+from ranking import build_candidate_materials, process_people_direct
 
 logger = setup_logger(__name__)
 
+# Container-level default, resolved once at import instead of on every invocation
+try:
+    _DEFAULT_RANK_BATCH_SIZE = int(os.getenv("RANK_BATCH_SIZE") or 5)
+except ValueError:
+    _DEFAULT_RANK_BATCH_SIZE = 5
+
 # Global event loop for Lambda container reuse - optimized for concurrency
 _event_loop = None
 
@@ -45,6 +48,21 @@ def get_or_create_event_loop():
 
     return _event_loop
 
+# Ranking output keys that are not copied verbatim onto the candidate
+_RANKING_PAYLOAD_SKIP_KEYS = frozenset({"nodeId", "recommendationScore"})
+
+# Fields read or rewritten by this stage. ``results``, ``reasoning`` and ``metrics`` are
+# written back whole, so they must be fetched whole; events and other stages' payloads are not.
+_SEARCH_DOC_PROJECTION = {
+    "query": 1,
+    "status": 1,
+    "flags": 1,
+    "hydeAnalysis": 1,
+    "results": 1,
+    "reasoning": 1,
+    "metrics": 1,
+}
+
 class SearchStatus:
     """Search execution status tracking"""
     NEW = "NEW"
@@ -53,110 +71,103 @@ class SearchStatus:
     RANK_AND_REASONING_COMPLETE = "RANK_AND_REASONING_COMPLETE"
     ERROR = "ERROR"
 
+# Statuses from which this stage may run and write back its results
+_READY_STATUSES = (SearchStatus.SEARCH_COMPLETE, SearchStatus.RANK_AND_REASONING_COMPLETE)
+
+# Event/error stage label and metrics field for this stage; both modes (with or without
+# reasoning) report under the same stage and finish with RANK_AND_REASONING_COMPLETE
+_STAGE_NAME = "RANK_AND_REASONING"
+_STAGE_METRICS_KEY = "rankAndReasoningMs"
+
 def get_utc_now():
     """Returns current UTC datetime in ISO format"""
     return datetime.now(timezone.utc).isoformat()
 
-async def process_reasoning_request(event_data: dict) -> dict:
-
-    def adapt_hyde_response_to_rank_details(hyde_resp: dict) -> dict:
-        """Flatten HyDE response into the structure expected by ranking prompts."""
-        if not isinstance(hyde_resp, dict):
-            return {}
+def _respond(status_code: int, payload: dict) -> dict:
+    """Build a Lambda proxy response, serializing the body exactly once."""
+    return {
+        "statusCode": status_code,
+        "body": orjson.dumps(payload, default=str).decode()
+    }
 
-        if any(key in hyde_resp for key in ("locations", "skills", "organizations", "sectors", "db_queries")):
-            return hyde_resp
+def candidate_sort_key(candidate: Dict) -> float:
+    """
+    Composite ordering key: score first, similarity as tie-breaker.
 
-        details = {}
+    Scores are 0-10 and similarity is bounded to [0, 1], so scaling the score by 1e6
+    keeps both orderings intact in a single float. Unscored candidates sort below
+    every scored one while still ordering among themselves by similarity.
+    """
+    score = candidate.get("score")
+    if score is None:
+        score = -1
+    return score * 1e6 + (candidate.get("similarity") or 0)
+
+# (source keys, item key, output key, operator key, temporal key) for each named HyDE section.
+# The first source key present wins; organisation details arrive under either spelling.
+_HYDE_NAMED_SECTIONS = (
+    (("locationDetails",), "locations", "locations", "location_operator", None),
+    (("organisationDetails", "organizationDetails"), "organizations", "organizations",
+     "organization_operator", "organization_temporal"),
+    (("sectorDetails",), "sectors", "sectors", "sector_operator", "sector_temporal"),
+    (("skillDetails",), "skills", "skills", "skill_operator", None),
+)
 
-        loc = hyde_resp.get("locationDetails", {})
-        if isinstance(loc, dict):
-            names = []
-            for item in loc.get("locations", []) or []:
-                if isinstance(item, dict):
-                    name = item.get("name")
-                else:
-                    name = item
-                if name:
-                    names.append(name)
-            if names:
-                details["locations"] = names
-            operator = loc.get("operator")
-            if operator:
-                details["location_operator"] = operator
-
-        org = hyde_resp.get("organisationDetails", {}) or hyde_resp.get("organizationDetails", {})
-        if isinstance(org, dict):
-            names = []
-            for item in org.get("organizations", []) or []:
-                if isinstance(item, dict):
-                    name = item.get("name")
-                else:
-                    name = item
-                if name:
-                    names.append(name)
-            if names:
-                details["organizations"] = names
-            operator = org.get("operator")
-            if operator:
-                details["organization_operator"] = operator
-            temporal = org.get("temporal")
-            if temporal:
-                details["organization_temporal"] = temporal
-
-        sector = hyde_resp.get("sectorDetails", {})
-        if isinstance(sector, dict):
-            names = []
-            for item in sector.get("sectors", []) or []:
-                if isinstance(item, dict):
-                    name = item.get("name")
-                else:
-                    name = item
-                if name:
-                    names.append(name)
-            if names:
-                details["sectors"] = names
-            operator = sector.get("operator")
-            if operator:
-                details["sector_operator"] = operator
-            temporal = sector.get("temporal")
+_RANK_DETAIL_KEYS = ("locations", "skills", "organizations", "sectors", "db_queries")
+
+def _hyde_item_name(item):
+    """HyDE list items are either plain strings or ``{"name": ...}`` dicts."""
+    return item.get("name") if isinstance(item, dict) else item
+
+def adapt_hyde_response_to_rank_details(hyde_resp: dict) -> dict:
+    """Flatten HyDE response into the structure expected by ranking prompts."""
+    if not isinstance(hyde_resp, dict):
+        return {}
+
+    if any(key in hyde_resp for key in _RANK_DETAIL_KEYS):
+        return hyde_resp
+
+    details = {}
+
+    for source_keys, item_key, out_key, operator_key, temporal_key in _HYDE_NAMED_SECTIONS:
+        section = None
+        for source_key in source_keys:
+            section = hyde_resp.get(source_key)
+            if section:
+                break
+        if not isinstance(section, dict):
+            continue
+
+        names = [name for name in map(_hyde_item_name, section.get(item_key) or []) if name]
+        if names:
+            details[out_key] = names
+        operator = section.get("operator")
+        if operator:
+            details[operator_key] = operator
+        if temporal_key:
+            temporal = section.get("temporal")
             if temporal:
-                details["sector_temporal"] = temporal
-
-        skills = hyde_resp.get("skillDetails", {})
-        if isinstance(skills, dict):
-            names = []
-            for item in skills.get("skills", []) or []:
-                if isinstance(item, dict):
-                    name = item.get("name")
-                else:
-                    name = item
-                if name:
-                    names.append(name)
-            if names:
-                details["skills"] = names
-            operator = skills.get("operator")
-            if operator:
-                details["skill_operator"] = operator
-
-        db_queries = hyde_resp.get("dbQueryDetails", {})
-        if isinstance(db_queries, dict):
-            queries = []
-            for query in db_queries.get("queries", []) or []:
-                if isinstance(query, dict):
-                    field_name = query.get("field", "")
-                    description = query.get("description", "") or ""
-                    if field_name:
-                        queries.append({"field": field_name, "description": description})
-            if queries:
-                details["db_queries"] = queries
-            operator = db_queries.get("operator")
-            if operator:
-                details["db_query_operator"] = operator
-
-        return details
-
-    start_time = datetime.now(timezone.utc)
+                details[temporal_key] = temporal
+
+    db_queries = hyde_resp.get("dbQueryDetails", {})
+    if isinstance(db_queries, dict):
+        queries = []
+        for query in db_queries.get("queries", []) or []:
+            if isinstance(query, dict):
+                field_name = query.get("field", "")
+                description = query.get("description", "") or ""
+                if field_name:
+                    queries.append({"field": field_name, "description": description})
+        if queries:
+            details["db_queries"] = queries
+        operator = db_queries.get("operator")
+        if operator:
+            details["db_query_operator"] = operator
+
+    return details
+
+async def process_reasoning_request(event_data: dict) -> dict:
+    start_monotonic = time.monotonic()
     search_id = event_data.get("searchId") or event_data.get("search_id") or event_data.get("search_output_id")
     user_id_raw = event_data.get("userId") or event_data.get("user_id")
     if isinstance(user_id_raw, dict) and "$oid" in user_id_raw:
@@ -168,32 +179,30 @@ async def process_reasoning_request(event_data: dict) -> dict:
 
     try:
         if not search_id:
-            return {
-                "statusCode": 400,
-                "body": json.dumps({"error": "Missing searchId in request"})
-            }
+            return _respond(400, {"error": "Missing searchId in request"})
 
         if not user_id:
-            return {
-                "statusCode": 400,
-                "body": json.dumps({"error": "Missing userId in request"})
-            }
+            return _respond(400, {"error": "Missing userId in request"})
 
         logger.info(f"Processing rank & reasoning for searchId={search_id}")
 
-        search_doc = get_search_document(search_id, user_id=user_id)
+        search_doc = get_search_document(
+            search_id,
+            user_id=user_id,
+            projection=_SEARCH_DOC_PROJECTION,
+        )
         if not search_doc:
-            return {
-                "statusCode": 404,
-                "body": json.dumps({"error": f"Search document not found for searchId: {search_id}"})
-            }
+            return _respond(404, {"error": f"Search document not found for searchId: {search_id}"})
+
+        status = search_doc.get("status")
+        if status and status not in _READY_STATUSES:
+            # The final update is guarded by the same statuses; reject now rather than
+            # after paying for ranking/reasoning calls whose write would be refused.
+            return _respond(400, {"error": f"Search {search_id} is not ready for ranking (status: {status})"})
 
         query = search_doc.get("query", "")
         if not query:
-            return {
-                "statusCode": 400,
-                "body": json.dumps({"error": "Search document missing query text"})
-            }
+            return _respond(400, {"error": "Search document missing query text"})
 
         flags = search_doc.get("flags", {}) or {}
         ranking_enabled = event_data.get("ranking_enabled")
@@ -219,90 +228,152 @@ async def process_reasoning_request(event_data: dict) -> dict:
         results_data = search_doc.get("results", {}) or {}
         existing_candidates: List[Dict] = results_data.get("candidates", []) or []
         if not existing_candidates:
-            return {
-                "statusCode": 400,
-                "body": json.dumps({"error": "No candidates available in search results"})
-            }
+            return _respond(400, {"error": "No candidates available in search results"})
 
         candidate_ids = event_data.get("candidateIds") or event_data.get("candidate_ids")
         if candidate_ids and isinstance(candidate_ids, str):
             candidate_ids = [candidate_ids]
 
         candidate_map = {c.get("nodeId"): c for c in existing_candidates if c.get("nodeId")}
+        missing_candidate_ids: List[str] = []
         if candidate_ids:
-            selected_ids = [str(cid) for cid in candidate_ids if cid]
-        else:
-            selected_ids = list(candidate_map.keys())
-
-        selected_ids = [cid for cid in selected_ids if cid in candidate_map]
-        missing_candidate_ids = []
-        if candidate_ids:
-            requested = [str(cid) for cid in candidate_ids if cid]
-            missing_candidate_ids = [cid for cid in requested if cid not in candidate_map]
+            # Single pass: normalize, de-duplicate and split into found/missing
+            selected_ids: List[str] = []
+            seen_ids = set()
+            for raw_id in candidate_ids:
+                if not raw_id:
+                    continue
+                cid = str(raw_id)
+                if cid in seen_ids:
+                    continue
+                seen_ids.add(cid)
+                if cid in candidate_map:
+                    selected_ids.append(cid)
+                else:
+                    missing_candidate_ids.append(cid)
             if missing_candidate_ids:
                 logger.warning(
                     "The following candidateIds were not found in search results: %s",
                     missing_candidate_ids
                 )
+        else:
+            selected_ids = list(candidate_map)
 
         if not selected_ids:
             logger.warning("No matching candidateIds provided - skipping processing")
-            return {
-                "statusCode": 200,
-                "body": json.dumps({
-                    "message": "No matching candidates found for provided candidateIds",
-                    "processedCandidateIds": [],
-                    "missingCandidateIds": missing_candidate_ids
-                })
-            }
+            return _respond(200, {
+                "message": "No matching candidates found for provided candidateIds",
+                "processedCandidateIds": [],
+                "missingCandidateIds": missing_candidate_ids
+            })
 
         hyde_analysis_full = search_doc.get("hydeAnalysis", {}) or {}
         hyde_analysis_response = hyde_analysis_full.get("response", {}) or {}
-        hyde_details_for_rank = adapt_hyde_response_to_rank_details(hyde_analysis_response)
-
-        batch_candidates = [candidate_map[cid] for cid in selected_ids]
-        materials = build_candidate_materials(batch_candidates, hyde_analysis_full)
-        transformed_map = materials.get("transformed_map", {})
 
-        ranking_results_map: Dict[str, Dict] = {}
+        # Adapted from the response on every invocation; a persisted copy could outlive a
+        # rewritten HyDE response
+        hyde_details_for_rank = None
         if ranking_enabled:
+            hyde_details_for_rank = adapt_hyde_response_to_rank_details(hyde_analysis_response)
+
+        async def run_ranking() -> Dict[str, Dict]:
+            """Enrich and rank the selected candidates; returns nodeId -> ranking payload."""
+            results_map: Dict[str, Dict] = {}
+            # Enrichment only feeds the ranking prompt; reasoning loads its own node documents
+            batch_candidates = [candidate_map[cid] for cid in selected_ids]
+            # Blocking HTTP enrichment runs off-loop so reasoning calls can proceed meanwhile
+            materials = await asyncio.to_thread(
+                build_candidate_materials, batch_candidates, hyde_analysis_full
+            )
+            transformed_map = materials.get("transformed_map", {})
             rank_people = [transformed_map[cid] for cid in selected_ids if cid in transformed_map]
 
             if not rank_people:
                 logger.warning("No enriched candidates available for ranking in this batch")
-            else:
-                rank_batch_size_value = (
-                    event_data.get("rank_batch_size")
-                    or os.getenv("RANK_BATCH_SIZE")
-                    or 5
-                )
-                try:
-                    rank_batch_size = int(rank_batch_size_value)
-                except (TypeError, ValueError):
-                    rank_batch_size = 5
-
-                ranked_results = await process_people_direct(
-                    rank_people,
-                    query,
-                    hyde_analysis_flags=hyde_details_for_rank,
-                    batch_size=rank_batch_size,
-                    max_concurrent_tasks=max_concurrent_calls,
-                    reasoning_model=model
-                )
-                for ranked in ranked_results:
-                    ranked_copy = convert_objectids_to_strings(ranked.copy())
-                    pid = ranked_copy.pop("nodeId", None)
-                    if not pid:
-                        continue
-                    ranking_results_map[pid] = ranked_copy
+                return results_map
 
+            rank_batch_size_value = event_data.get("rank_batch_size") or _DEFAULT_RANK_BATCH_SIZE
+            try:
+                rank_batch_size = int(rank_batch_size_value)
+            except (TypeError, ValueError):
+                rank_batch_size = _DEFAULT_RANK_BATCH_SIZE
+
+            ranked_results = await process_people_direct(
+                rank_people,
+                query,
+                hyde_analysis_flags=hyde_details_for_rank,
+                batch_size=rank_batch_size,
+                max_concurrent_tasks=ranking_concurrency,
+                reasoning_model=model
+            )
+            for ranked in ranked_results:
+                pid = ranked.get("nodeId")
+                if not pid:
+                    continue
+                results_map[pid] = ranked
+            return results_map
+
+        async def run_reasoning() -> Dict[str, Dict]:
+            """Generate reasoning insights for the selected candidates; returns nodeId -> result."""
+            results_map: Dict[str, Dict] = {}
+            if not selected_ids:
+                logger.warning("No reasoning nodes available for batch")
+                return results_map
+
+            # Imported lazily to keep reasoning-disabled cold starts lean
+            from reasoning_logic import SearchReasoning
+
+            search_reasoning = SearchReasoning(max_concurrent_calls=reasoning_concurrency)
+            reasoning_results = await search_reasoning.batch_analyze_profiles(
+                selected_ids,
+                query,
+                model,
+                hyde_analysis_response
+            )
+            for result in reasoning_results:
+                node_id = result.get("nodeId")
+                if node_id:
+                    results_map[node_id] = result
+            return results_map
+
+        async def skip_stage() -> Dict[str, Dict]:
+            return {}
+
+        # Ranking and reasoning are independent until their results are merged, so run them
+        # concurrently; both are allowed to finish before any failure is re-raised. Each stage
+        # caps its own in-flight LLM calls, so max_concurrent_calls is split between them to
+        # keep the invocation's total within what the caller asked for.
+        run_concurrently = ranking_enabled and reasoning_enabled and max_concurrent_calls >= 2
+        if run_concurrently:
+            ranking_concurrency = (max_concurrent_calls + 1) // 2
+            reasoning_concurrency = max_concurrent_calls - ranking_concurrency
+            stage_results = await asyncio.gather(
+                run_ranking(),
+                run_reasoning(),
+                return_exceptions=True,
+            )
+        else:
+            # A single stage (or a limit of one call) gets the whole budget; with both stages
+            # enabled they run one after the other
+            ranking_concurrency = reasoning_concurrency = max_concurrent_calls
+            stage_results = [
+                await (run_ranking() if ranking_enabled else skip_stage()),
+                await (run_reasoning() if reasoning_enabled else skip_stage()),
+            ]
+        for stage_result in stage_results:
+            # BaseException so a cancelled stage is re-raised instead of unpacked as a result
+            if isinstance(stage_result, BaseException):
+                raise stage_result
+        ranking_results_map, reasoning_results_map = stage_results
+
+        if ranking_enabled:
             for cid in selected_ids:
                 candidate = candidate_map[cid]
                 payload = ranking_results_map.get(cid)
                 if payload:
                     candidate["score"] = payload.get("recommendationScore", candidate.get("score"))
                     for key, value in payload.items():
-                        if key == "recommendationScore":
+                        if key in _RANKING_PAYLOAD_SKIP_KEYS:
                             continue
                         candidate[key] = value
                 else:
@@ -310,25 +381,7 @@ async def process_reasoning_request(event_data: dict) -> dict:
         else:
             logger.info("Ranking disabled for this invocation; preserving existing scores")
 
-        reasoning_results_map: Dict[str, Dict] = {}
-        reasoning_results: List[Dict] = []
         if reasoning_enabled:
-            reasoning_nodes = [{"nodeId": cid} for cid in selected_ids]
-            if not reasoning_nodes:
-                logger.warning("No reasoning nodes available for batch")
-            else:
-                search_reasoning = SearchReasoning(max_concurrent_calls=max_concurrent_calls)
-                reasoning_results = await search_reasoning.batch_analyze_profiles(
-                    reasoning_nodes,
-                    query,
-                    model,
-                    hyde_analysis_response
-                )
-                for result in reasoning_results:
-                    node_id = result.get("nodeId")
-                    if node_id:
-                        reasoning_results_map[node_id] = result
-
             for cid in selected_ids:
                 candidate = candidate_map[cid]
                 result = reasoning_results_map.get(cid)
@@ -360,52 +413,49 @@ async def process_reasoning_request(event_data: dict) -> dict:
         else:
             logger.info("Reasoning disabled for this invocation")
 
-        def sort_key(candidate: Dict) -> tuple:
-            score = candidate.get("score")
-            similarity = candidate.get("similarity", 0)
-            if score is None:
-                return (float("-inf"), similarity)
-            return (score, similarity)
+        sorted_candidates = sorted(existing_candidates, key=candidate_sort_key, reverse=True)
+
+        processing_time = time.monotonic() - start_monotonic
+        # Single wall-clock capture reused for every persisted timestamp below
+        now_iso = get_utc_now()
+
+        existing_metadata = (search_doc.get("reasoning") or {}).get("metadata", {}) or {}
+        cumulative_processing_time = float(existing_metadata.get("processing_time_seconds", 0.0)) + processing_time
 
-        sorted_candidates = sorted(existing_candidates, key=sort_key, reverse=True)
+        scored_count = processed_count = successful_count = failed_count = 0
+        for candidate in sorted_candidates:
+            if candidate.get("score") is not None:
+                scored_count += 1
+            reasoning = candidate.get("reasoning")
+            if not isinstance(reasoning, dict):
+                continue
+            processed_count += 1
+            error = reasoning.get("error")
+            complete = reasoning.get("reasoning_complete")
+            if complete and not error:
+                successful_count += 1
+            elif complete is False or error:
+                failed_count += 1
 
         summary = results_data.get("summary", {}) or {}
         summary.update({
             "count": len(sorted_candidates),
-            "topK": len([c for c in sorted_candidates if c.get("score") is not None]),
+            "topK": scored_count,
             "idsOnly": False
         })
 
-        processing_time = (datetime.now(timezone.utc) - start_time).total_seconds()
-
-        existing_metadata = (search_doc.get("reasoning") or {}).get("metadata", {}) or {}
-        cumulative_processing_time = float(existing_metadata.get("processing_time_seconds", 0.0)) + processing_time
-
-        processed_reasoning = [
-            c for c in sorted_candidates
-            if isinstance(c.get("reasoning"), dict)
-        ]
-        successful_reasoning = [
-            c for c in processed_reasoning
-            if c["reasoning"].get("reasoning_complete") and not c["reasoning"].get("error")
-        ]
-        failed_reasoning = [
-            c for c in processed_reasoning
-            if c["reasoning"].get("reasoning_complete") is False or c["reasoning"].get("error")
-        ]
-
         metadata = existing_metadata.copy()
         metadata.update({
             "total_nodes": len(sorted_candidates),
-            "reasoning_nodes_processed": len(processed_reasoning),
-            "successful_count": len(successful_reasoning),
-            "failed_count": len(failed_reasoning),
+            "reasoning_nodes_processed": processed_count,
+            "successful_count": successful_count,
+            "failed_count": failed_count,
             "processing_time_seconds": cumulative_processing_time,
             "model_used": model,
             "query": query,
             "ranking_enabled": bool(ranking_enabled),
             "reasoning_enabled": bool(reasoning_enabled),
-            "timestamp": get_utc_now()
+            "timestamp": now_iso
         })
 
         batch_number = event_data.get("batchNumber") or event_data.get("batch_number")
@@ -427,7 +477,6 @@ async def process_reasoning_request(event_data: dict) -> dict:
         else:
             is_final_batch = bool(raw_is_final_batch)
 
-        now = datetime.now(timezone.utc)
         stage_message_parts = [f"Processed {len(selected_ids)} candidates"]
         if batch_number and total_batches:
             stage_message_parts.append(f"batch {batch_number}/{total_batches}")
@@ -444,14 +493,14 @@ async def process_reasoning_request(event_data: dict) -> dict:
         existing_reasoning["metadata"] = metadata
 
         existing_metrics = deepcopy(search_doc.get("metrics") or {})
-        current_ms = existing_metrics.get("rankAndReasoningMs", 0) or 0
-        existing_metrics["rankAndReasoningMs"] = current_ms + processing_time * 1000
+        current_ms = existing_metrics.get(_STAGE_METRICS_KEY, 0) or 0
+        existing_metrics[_STAGE_METRICS_KEY] = current_ms + processing_time * 1000
 
         set_fields = {
             "results": existing_results,
             "reasoning": existing_reasoning,
             "metrics": existing_metrics,
-            "updatedAt": now.isoformat()
+            "updatedAt": now_iso
         }
         if is_final_batch:
             set_fields["status"] = SearchStatus.RANK_AND_REASONING_COMPLETE
@@ -463,12 +512,12 @@ async def process_reasoning_request(event_data: dict) -> dict:
                 set_fields=set_fields,
                 append_events=[
                     {
-                        "stage": "RANK_AND_REASONING",
+                        "stage": _STAGE_NAME,
                         "message": stage_message,
-                        "timestamp": now.isoformat()
+                        "timestamp": now_iso
                     }
                 ],
-                expected_statuses=[SearchStatus.SEARCH_COMPLETE, SearchStatus.RANK_AND_REASONING_COMPLETE],
+                expected_statuses=list(_READY_STATUSES),
             )
         except SearchServiceError as update_error:
             logger.error("Failed to update search document %s: %s", search_id, update_error)
@@ -492,10 +541,7 @@ async def process_reasoning_request(event_data: dict) -> dict:
         # Small delay to let any background HTTP clients cleanup naturally
         await asyncio.sleep(0.1)
 
-        return {
-            "statusCode": 200,
-            "body": json.dumps(response_body)
-        }
+        return _respond(200, response_body)
 
     except Exception as e:
         logger.error(f"Error processing reasoning request: {str(e)}")
@@ -504,25 +550,25 @@ async def process_reasoning_request(event_data: dict) -> dict:
         # Update search document with error state if we have searchId
         if search_id and user_id:
             try:
-                now = datetime.now(timezone.utc)
+                now_iso = get_utc_now()
                 update_search_document(
                     search_id,
                     user_id=user_id,
                     set_fields={
                         "status": SearchStatus.ERROR,
                         "error": {
-                            "stage": "RANK_AND_REASONING",
+                            "stage": _STAGE_NAME,
                             "message": str(e),
                             "stackTrace": traceback.format_exc(),
-                            "occurredAt": now.isoformat()
+                            "occurredAt": now_iso
                         },
-                        "updatedAt": now.isoformat()
+                        "updatedAt": now_iso
                     },
                     append_events=[
                         {
-                            "stage": "RANK_AND_REASONING",
+                            "stage": _STAGE_NAME,
                             "message": f"Error: {str(e)}",
-                            "timestamp": now.isoformat()
+                            "timestamp": now_iso
                         }
                     ],
                 )
@@ -532,13 +578,10 @@ async def process_reasoning_request(event_data: dict) -> dict:
         # Small delay to let any background HTTP clients cleanup naturally
         await asyncio.sleep(0.1)
 
-        return {
-            'statusCode': 500,
-            'body': json.dumps({
-                'error': f'Internal server error: {str(e)}',
-                'timestamp': get_utc_now()
-            })
-        }
+        return _respond(500, {
+            'error': f'Internal server error: {str(e)}',
+            'timestamp': get_utc_now()
+        })
 
 def lambda_handler(event, context):
     """
@@ -558,7 +601,8 @@ def lambda_handler(event, context):
     }
     """
     try:
-        logger.info(f"Received reasoning request: {json.dumps(event, default=str)}")
+        # Log identifiers only; the full event can carry large candidate/HyDE payloads
+        logger.info("Received reasoning request: searchId=%s keys=%s", event.get("searchId"), list(event))
 
         # Get or create the event loop for this Lambda container
         loop = get_or_create_event_loop()
@@ -573,13 +617,10 @@ def lambda_handler(event, context):
     except Exception as e:
         logger.error(f"Lambda handler error: {str(e)}")
         logger.error(traceback.format_exc())
-        return {
-            'statusCode': 500,
-            'body': {
-                'error': f'Lambda handler error: {str(e)}',
-                'timestamp': get_utc_now()
-            }
-        }
+        return _respond(500, {
+            'error': f'Lambda handler error: {str(e)}',
+            'timestamp': get_utc_now()
+        })
 
 # For local testing
 if __name__ == "__main__":
@@ -1,14 +1,69 @@
+import asyncio
 import os
 from typing import List, Dict, Optional, Any
 from litellm import ModelResponse
 import litellm
+import httpx
 from openai import OpenAIError
-from model_config import MODEL_CONFIGS
+from model_config import MODEL_CONFIGS, ModelCfg, get_model_config, iter_provider_api_keys
 from callback import CustomCallback
 import time
 import logging
 from logging_config import setup_logger
 
+# Per-call bounds applied unless a provider config overrides them. litellm's own retries stay
+# off by default: process_batch already retries each batch and get_completion falls back to a
+# second model, so inner retries would multiply the attempts past the Lambda time limit
+DEFAULT_TIMEOUT_SECONDS = 60
+DEFAULT_NUM_RETRIES = 0
+
+
+# One keep-alive pool for every litellm call in the container so warm invocations skip the
+# TCP+TLS handshake. httpx pools belong to the event loop that opened them, so the client is
+# rebuilt if the handler ever has to replace its loop.
+LLM_HTTP_MAX_CONNECTIONS = 100
+LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS = 20
+
+_http_client: Optional[httpx.AsyncClient] = None
+_http_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+async def _ensure_http_client() -> None:
+    """Point ``litellm.aclient_session`` at a pooled client bound to the running loop.
+
+    A session installed by anyone else is left in place; ours is closed before it is replaced.
+    """
+    global _http_client, _http_client_loop
+    loop = asyncio.get_running_loop()
+    if _http_client is not None and _http_client_loop is loop:
+        return
+    current = getattr(litellm, "aclient_session", None)
+    if current is not None and current is not _http_client:
+        return
+    previous = _http_client
+    _http_client = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=LLM_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        ),
+        timeout=httpx.Timeout(DEFAULT_TIMEOUT_SECONDS),
+    )
+    _http_client_loop = loop
+    litellm.aclient_session = _http_client
+    if previous is not None:
+        try:
+            await previous.aclose()
+        except Exception as exc:
+            # Its connections belonged to the replaced loop and may already be unusable
+            logging.getLogger(__name__).debug("Closing the previous LLM HTTP client failed: %s", exc)
+
+
+# Environment credentials are written once per container rather than per manager
+_credentials_set = False
+
+_llm_manager: Optional["LLMManager"] = None
+
+
 class LLMManager:   
     def __init__(self):
         # Use our centralized logging configuration
@@ -20,27 +75,33 @@ class LLMManager:
         self.callbacks.append(self.custom_callback)
         litellm.callbacks = self.callbacks
         
+        global _credentials_set
         try:
-            self._set_credentials()
+            # Credentials come from MODEL_CONFIGS, which is fixed for the life of the container
+            if not _credentials_set:
+                self._set_credentials()
+                _credentials_set = True
         except Exception as e:
             self.logger.error(f"Failed to set credentials: {str(e)}")
             raise
 
+    @staticmethod
+    def _set_env(key: str, value: Optional[str]) -> None:
+        """Write an env var only when it changes; each write is a putenv call."""
+        if value and os.environ.get(key) != value:
+            os.environ[key] = value
+
     def _set_credentials(self):
         # Set standard API keys
-        for provider, config in MODEL_CONFIGS.items():
-            if config.get("api_key"):
-                os.environ[f"{provider.upper()}_API_KEY"] = config["api_key"]
+        for provider, api_key in iter_provider_api_keys():
+            self._set_env(f"{provider.upper()}_API_KEY", api_key)
         
         # Set AWS credentials for Bedrock
-        for provider, config in MODEL_CONFIGS.items():
-            if provider == "anthropic_aws":
-                if config.get("aws_access_key_id"):
-                    os.environ["AWS_ACCESS_KEY_ID"] = config["aws_access_key_id"]
-                if config.get("aws_secret_access_key"):
-                    os.environ["AWS_SECRET_ACCESS_KEY"] = config["aws_secret_access_key"]
-                if config.get("aws_region_name"):
-                    os.environ["AWS_REGION_NAME"] = config["aws_region_name"]
+        aws_config = MODEL_CONFIGS.get("anthropic_aws")
+        if aws_config:
+            self._set_env("AWS_ACCESS_KEY_ID", aws_config.aws_access_key_id)
+            self._set_env("AWS_SECRET_ACCESS_KEY", aws_config.aws_secret_access_key)
+            self._set_env("AWS_REGION_NAME", aws_config.aws_region_name)
     
     async def get_completion(
         self,
@@ -52,16 +113,16 @@ class LLMManager:
         temperature: Optional[float] = None,
     ) -> ModelResponse:
         """Get completion from LLM provider with improved error handling and logging"""
-        self.logger.info(f"Getting completion from provider: {provider}")
+        self.logger.info("Getting completion from provider: %s", provider)
         
         try:
-            config = MODEL_CONFIGS[provider]
+            config = get_model_config(provider)
         except KeyError:
             self.logger.error(f"Invalid provider: {provider}")
             raise ValueError(f"Provider {provider} not found in MODEL_CONFIGS")
 
-        model = config["model"]
-        self.logger.info(f"Using model: {model}")
+        model = config.model
+        self.logger.info("Using model: %s", model)
 
         # Build model params with logging
         try:
@@ -70,6 +131,8 @@ class LLMManager:
             self.logger.error(f"Error building model parameters: {str(e)}")
             raise
 
+        await _ensure_http_client()
+
         # Primary model attempt
         try:
             self.logger.info("Sending request to primary model")
@@ -81,16 +144,27 @@ class LLMManager:
             self.logger.error(f"Error with primary model: {str(e)}")
             
             # Attempt fallback if enabled and available
-            if fallback and "fallback_model" in config:
-                return await self._try_fallback(config, model_params, e)
+            if fallback and config.fallback_model:
+                return await self._try_fallback(config, messages, stop, response_format, temperature, e)
             raise
 
-    async def _try_fallback(self, config: Dict, model_params: Dict, original_error: Exception) -> ModelResponse:
+    async def _try_fallback(
+        self,
+        config: ModelCfg,
+        messages: List,
+        stop: Optional[List[str]],
+        response_format: Optional[Dict],
+        temperature: Optional[float],
+        original_error: Exception,
+    ) -> ModelResponse:
         """Helper method to handle fallback logic"""
         try:
-            fallback_model = config["fallback_model"]
+            fallback_model = config.fallback_model
             self.logger.info(f"Attempting fallback to {fallback_model}")
-            model_params["model"] = fallback_model
+            # Rebuilt rather than reused: prefill filtering and content flattening depend on
+            # the model family, which may differ from the primary's
+            model_params = self._build_model_params(
+                config, messages, stop, response_format, temperature, model=fallback_model)
             response = await litellm.acompletion(**model_params)
             self.logger.info("Fallback request successful")
             return response
@@ -100,44 +174,73 @@ class LLMManager:
             # Re-raise original error to maintain error context
             raise original_error
 
+    @staticmethod
+    def _flatten_content(message: Dict[str, Any]) -> Dict[str, Any]:
+        """Join a message's text content blocks back into a single string."""
+        content = message.get("content")
+        if not isinstance(content, list):
+            return message
+        return {**message, "content": "".join(block.get("text", "") for block in content)}
+
     def _build_model_params(
         self, 
-        config: Dict, 
+        config: ModelCfg,
         messages: List, 
         stop: Optional[List[str]], 
         response_format: Optional[Dict],
         temperature: Optional[float] = None,
+        model: Optional[str] = None,
     ) -> Dict:
-        """Helper method to build model parameters"""
+        """Helper method to build model parameters; ``model`` overrides ``config.model``"""
+        model = model or config.model
         # Filter out last assistant message for non-Anthropic models
         filtered_messages = messages
-        model_name = config["model"].lower()
+        model_name = model.lower()
         if not ("anthropic" in model_name or "claude" in model_name) and messages:
             if messages[-1].get("role") == "assistant":
                 filtered_messages = messages[:-1]
                 self.logger.debug("Filtered out last assistant message for non-Anthropic model")
+            # cache_control content blocks are Anthropic-specific; other providers get plain text
+            filtered_messages = [self._flatten_content(message) for message in filtered_messages]
 
         model_params = {
-            "model": config["model"],
+            "model": model,
             "messages": filtered_messages,
-            "max_tokens": config.get("max_tokens"),
-            "temperature": temperature if temperature is not None else config.get("temperature"),
+            "max_tokens": config.max_tokens,
+            "temperature": temperature if temperature is not None else config.temperature,
+            # Bound every call so a hung upstream cannot hold the invocation until the Lambda limit
+            "timeout": config.timeout if config.timeout is not None else DEFAULT_TIMEOUT_SECONDS,
+            "num_retries": config.num_retries if config.num_retries is not None else DEFAULT_NUM_RETRIES,
         }
 
         if stop:
             model_params["stop"] = stop
-            self.logger.debug(f"Using stop sequences: {stop}")
+            self.logger.debug("Using stop sequences: %s", stop)
 
         if response_format:
             model_params["response_format"] = response_format
-            self.logger.debug(f"Using response format: {response_format}")
+            # Response formats are often large JSON schemas; skip rendering them unless debugging
+            if self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug("Using response format: %s", response_format)
 
         # Add AWS-specific parameters for Bedrock
-        if config.get("aws_access_key_id"):
+        if config.aws_access_key_id:
             model_params.update({
-                "aws_access_key_id": config["aws_access_key_id"],
-                "aws_secret_access_key": config.get("aws_secret_access_key"),
-                "aws_region_name": config.get("aws_region_name")
+                "aws_access_key_id": config.aws_access_key_id,
+                "aws_secret_access_key": config.aws_secret_access_key,
+                "aws_region_name": config.aws_region_name
             })
 
-        return model_params
\ No newline at end of file
+        return model_params
+
+
+def get_llm_manager() -> LLMManager:
+    """Return the container-wide LLMManager, creating it on first use.
+
+    Reusing one manager keeps warm invocations from re-registering ``litellm.callbacks``
+    while another request's completions are still in flight.
+    """
+    global _llm_manager
+    if _llm_manager is None:
+        _llm_manager = LLMManager()
+    return _llm_manager
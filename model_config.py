@@ -1,17 +1,61 @@
-from typing import Dict, Any
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Any, Iterator, Mapping, Optional, Tuple
 import os
-from dotenv import load_dotenv
 
-# Load environment variables
-load_dotenv()
+from config import load_local_env
+
+# Environment variable holding each provider's API key; read only when that provider is used
+_API_KEY_ENV: Dict[str, str] = {
+    "openai4o": "OPENAI_API_KEY",
+    "openai4o_mini": "OPENAI_API_KEY",
+    "anthropic_sonnet": "ANTHROPIC_API_KEY",
+    "anthropic_haiku": "ANTHROPIC_API_KEY",
+    "gemini": "GEMINI_API_KEY",
+    "groq_mixtral": "GROQ_API_KEY",
+    "groq_llama": "GROQ_API_KEY",
+    "groq_gemma": "GROQ_API_KEY",
+    "groq_deepseek_r": "GROQ_API_KEY",
+    "deepseek": "DEEPSEEK_API_KEY",
+    "deepseek-r": "DEEPSEEK_API_KEY",
+    "together-deepseek": "TOGETHERAI_API_KEY",
+}
+
+
+# Provider keys may come from .env locally; a no-op on Lambda and once config has loaded it
+load_local_env()
+
+
+@lru_cache(maxsize=None)
+def _read_api_key(env_var: str) -> Optional[str]:
+    """Read a key variable once; entries sharing a provider key share one string object."""
+    return os.getenv(env_var)
 
 
-# Model configurations
-MODEL_CONFIGS: Dict[str, Dict[str, Any]] = {
+@dataclass(frozen=True, slots=True)
+class ModelCfg:
+    """Resolved configuration for one provider key; read on every completion call."""
+    model: str
+    fallback_model: Optional[str] = None
+    api_key: Optional[str] = None
+    max_tokens: Optional[int] = None
+    temperature: Optional[float] = None
+    allowed_fails: Optional[int] = None
+    cooldown_time: Optional[int] = None
+    # Override the per-call bounds in llm_helper when set
+    timeout: Optional[float] = None
+    num_retries: Optional[int] = None
+    # Bedrock credentials
+    aws_access_key_id: Optional[str] = None
+    aws_secret_access_key: Optional[str] = None
+    aws_region_name: Optional[str] = None
+
+
+# Model configurations (static ModelCfg fields; "api_key" is resolved lazily from _API_KEY_ENV)
+_MODEL_CONFIGS: Dict[str, Dict[str, Any]] = {
     "openai4o": {
         "model": "gpt-4o",
         "fallback_model": "gpt-4o-mini",
-        "api_key": os.getenv("OPENAI_API_KEY",),
         "max_tokens": 4096,
         "temperature": 0,
         "allowed_fails": 3,
@@ -20,7 +64,6 @@ MODEL_CONFIGS: Dict[str, Dict[str, Any]] = {
     "openai4o_mini": {
         "model": "gpt-4o-mini",
         "fallback_model": "gpt-4o",
-        "api_key": os.getenv("OPENAI_API_KEY"),
         "max_tokens": 4096,
         "temperature": 0,
         "allowed_fails": 3,
@@ -29,7 +72,6 @@ MODEL_CONFIGS: Dict[str, Dict[str, Any]] = {
     "anthropic_sonnet": {
         "model": "claude-3-5-sonnet-20240620",
         "fallback_model": "claude-3-5-haiku-20241022",
-        "api_key": os.getenv("ANTHROPIC_API_KEY"),
         "max_tokens": 4096,
         "temperature": 0,
         "allowed_fails": 3,
@@ -38,7 +80,6 @@ MODEL_CONFIGS: Dict[str, Dict[str, Any]] = {
     "anthropic_haiku": {
         "model": "claude-3-5-haiku-20241022",
         "fallback_model": "gemini/gemini-2.0-flash",
-        "api_key": os.getenv("ANTHROPIC_API_KEY"),
         "max_tokens": 8192,
         "temperature": 0,
         "allowed_fails": 3,
@@ -47,7 +88,6 @@ MODEL_CONFIGS: Dict[str, Dict[str, Any]] = {
     "gemini": {
         "model": "gemini/gemini-2.0-flash",
         "fallback_model": "claude-3-5-haiku-20241022",
-        "api_key": os.getenv("GEMINI_API_KEY"),
         "max_tokens": 10000,
         "temperature": 0,
         "allowed_fails": 3,
@@ -56,7 +96,6 @@ MODEL_CONFIGS: Dict[str, Dict[str, Any]] = {
     "groq_mixtral": {
         "model": "groq/mixtral-8x7b-32768",
         "fallback_model": "claude-3-5-haiku-20241022",
-        "api_key": os.getenv("GROQ_API_KEY"),
         "max_tokens": 4000,
         "temperature": 0,
         "allowed_fails": 3,
@@ -65,7 +104,6 @@ MODEL_CONFIGS: Dict[str, Dict[str, Any]] = {
     "groq_llama": {
         "model": "groq/llama-3.3-70b-versatile",
         "fallback_model": "claude-3-5-haiku-20241022",
-        "api_key": os.getenv("GROQ_API_KEY"),
         "max_tokens": 4000,
         "temperature": 0,
         "allowed_fails": 3,
@@ -74,7 +112,6 @@ MODEL_CONFIGS: Dict[str, Dict[str, Any]] = {
     "groq_gemma": {
         "model": "groq/gemma2-9b-it",
         "fallback_model": "claude-3-5-haiku-20241022",
-        "api_key": os.getenv("GROQ_API_KEY"),
         "max_tokens": 4000,
         "temperature": 0,
         "allowed_fails": 3,
@@ -83,7 +120,6 @@ MODEL_CONFIGS: Dict[str, Dict[str, Any]] = {
     "groq_deepseek_r": {
         "model": "groq/deepseek-r1-distill-llama-70b",
         "fallback_model": "claude-3-5-haiku-20241022",
-        "api_key": os.getenv("GROQ_API_KEY"),
         "max_tokens": 4096,
         # "temperature": 0,
         "allowed_fails": 3,
@@ -92,7 +128,6 @@ MODEL_CONFIGS: Dict[str, Dict[str, Any]] = {
     "deepseek": {
         "model": "deepseek/deepseek-chat",
         "fallback_model": "together_ai/deepseek-ai/DeepSeek-V3",
-        "api_key": os.getenv("DEEPSEEK_API_KEY"),
         "max_tokens": 4096,
         "temperature": 1,
         "allowed_fails": 3,
@@ -101,7 +136,6 @@ MODEL_CONFIGS: Dict[str, Dict[str, Any]] = {
     "deepseek-r": {
         "model": "deepseek/deepseek-reasoner",
         "fallback_model": "claude-3-5-haiku-20241022",
-        "api_key": os.getenv("DEEPSEEK_API_KEY"),
         "max_tokens": 6000,
         # "temperature": 1,
         "allowed_fails": 3,
@@ -110,7 +144,6 @@ MODEL_CONFIGS: Dict[str, Dict[str, Any]] = {
     "together-deepseek": {
         "model": "together_ai/deepseek-ai/DeepSeek-V3",
         "fallback_model": "claude-3-5-haiku-20241022",
-        "api_key": os.getenv("TOGETHERAI_API_KEY"),
         "max_tokens": 8000,
         "temperature": 1,
         "allowed_fails": 3,
@@ -125,5 +158,50 @@ MODEL_CONFIGS: Dict[str, Dict[str, Any]] = {
         "cooldown_time": 60
     }
 }
-# Callback configurations with empty default
-ENABLED_CALLBACKS = os.getenv("ENABLED_CALLBACKS", "").split(",")
\ No newline at end of file
+class _LazyModelConfigs(Mapping):
+    """Read-only provider table that reads an entry's API key on first access.
+
+    Resolved entries are cached as frozen ModelCfg instances: configs are shared by every
+    LLMManager call in the container and must not be mutated per request.
+    """
+
+    def __init__(self, static_configs: Dict[str, Dict[str, Any]]):
+        self._static_configs = static_configs
+        self._resolved: Dict[str, ModelCfg] = {}
+
+    def __getitem__(self, name: str) -> ModelCfg:
+        config = self._resolved.get(name)
+        if config is None:
+            entry = self._static_configs[name]
+            env_var = _API_KEY_ENV.get(name)
+            api_key = _read_api_key(env_var) if env_var else None
+            config = self._resolved[name] = ModelCfg(**entry, api_key=api_key)
+        return config
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._static_configs)
+
+    def __len__(self) -> int:
+        return len(self._static_configs)
+
+
+MODEL_CONFIGS: Mapping[str, ModelCfg] = _LazyModelConfigs(_MODEL_CONFIGS)
+
+
+def iter_provider_api_keys() -> Iterator[Tuple[str, Optional[str]]]:
+    """Yield (provider, api_key) pairs from the key column alone, without building full configs."""
+    for provider, env_var in _API_KEY_ENV.items():
+        yield provider, _read_api_key(env_var)
+
+
+@lru_cache(maxsize=None)
+def get_model_config(name: str) -> ModelCfg:
+    """Return the config for a provider key; raises KeyError for unknown providers."""
+    return MODEL_CONFIGS[name]
+
+
+@lru_cache(maxsize=None)
+def enabled_callbacks() -> Tuple[str, ...]:
+    """Callback names from ENABLED_CALLBACKS, comma-separated; empty when unset."""
+    raw = os.getenv("ENABLED_CALLBACKS", "")
+    return tuple(name.strip() for name in raw.split(",") if name.strip())
@@ -1,149 +1,7 @@
-message = """You are an expert talent matcher with a preference for finding good matches rather than perfect ones. The profiles you're evaluating have already passed through sophisticated search filters, so they have some degree of relevance. Your job is to identify the best candidates while being generous with scoring.
+from prompts.template import lazy_prompt_attributes
 
-Today's date is {{CURRENT_DATE}}.
-
-Query:
-<query>
-{{QUERY}}
-</query>
-
-Pre-Analyzed Query Criteria (from Hyde):
-The following XML block contains the specific locations, organizations, skills, database criteria, and sectors identified as relevant to the query by a prior analysis step (Hyde).
-Each section (`<locations>`, `<organizations>`, `<skills>`, `<database_queries>`, `<sectors>`) has an `operator` attribute ("AND" or "OR") indicating how to treat the items within that section.
-Organizations and sectors may also have a `temporal` attribute ("current", "past", "any") indicating the time context.
-Database queries contain field-specific criteria that profiles should match (e.g., education requirements, graduation years, company types).
-Use *only* these listed items and their corresponding operators as the criteria for scoring. If a section is missing or empty, that factor is not relevant.
-
-{{HYDE_ANALYSIS_XML}}
-
-Profiles to Analyze:
-Each profile below contains comprehensive information including education, work experience, accomplishments, and volunteering activities.
-The profiles are presented in rich XML format with detailed work history, educational background, certifications, honors, and other relevant information.
-
-<list_of_persons>
-{{LIST_OF_PERSONS}}
-</list_of_persons>
-
-Step 2 - Generous Scoring Guidelines:
-Since these profiles have already been filtered for relevance, be generous with scoring while still differentiating quality.
-
-1. Determine Scoring Components & Weights:
-   Based on the presence of sections in `<hyde_analysis>` XML:
-   - If `<skills>` tag is present: Skills Match gets **40%** weight (skills are most important)
-   - If `<locations>` tag is present: Location Match gets **20%** weight  
-   - If `<organizations>` tag is present: Entity Match gets **20%** weight
-   - If `<database_queries>` tag is present: Database Match gets **15%** weight
-   - If `<sectors>` tag is present: Sector Match gets **15%** weight
-   
-   **Redistribute weights proportionally among present components only:**
-   - If only skills: 100% to skills
-   - If skills + location: 67% skills, 33% location  
-   - If skills + location + entity: 50% skills, 25% location, 25% entity
-   - If all 5 components: 40% skills, 20% location, 20% entity, 10% database, 10% sector
-
-2. Component Scoring (Be Generous):
-   - **Skills Match (When Present) - GENEROUS SCORING:**
-     - Analyze the comprehensive profile data including work experience, education, accomplishments, and volunteering
-     - Check job titles, company descriptions, education degrees, certifications, honors, and project descriptions for skill evidence
-     - If operator="AND": Score 1.0 if profile shows relevance to most listed skills (70%+), 0.8 if shows relevance to some skills (50%+), 0.5 if minimal relevance
-     - If operator="OR": Score 1.0 if profile shows ANY reasonable connection to listed skills:
-       - Score 1.0 (Strong Match) if ANY of these are true:
-         - Profile mentions the skill directly in job descriptions, titles, or accomplishments
-         - Profile has relevant education/certifications in the skill area
-         - Profile works in a domain where the skill is commonly used
-         - Profile has projects or honors related to the skill
-       - Score 0.8 (Good Match) if:
-         - Profile has adjacent/transferable skills shown in work history
-         - Profile works in related field or has relevant education background
-         - Profile shows potential to have the skill based on comprehensive background
-       - Score 0.5 (Weak Match) if:
-         - Profile has some distant connection to skill area in work or education
-         - Profile shows general technical/business competence that could transfer
-       - Score 0.3 only if absolutely no connection can be found across all profile data
-
-   - **Location Match (When Present) - GENEROUS SCORING:**
-     - If operator="AND": Score 1.0 if location matches most requirements, 0.8 if matches some, 0.5 if in broader region
-     - If operator="OR": Score 1.0 if ANY reasonable location connection:
-       - Score 1.0 (Great Match) if:
-         - Current location matches or is very close to any listed location
-         - Location is in same metropolitan area, state, or region
-         - Location suggests person could reasonably work in target area
-       - Score 0.8 (Good Match) if:
-         - Location is in broader geographical area (same country/timezone)
-         - Location suggests person has mobility or remote work potential
-       - Score 0.5 (Acceptable) if:
-         - Location is different but person seems open to relocation/remote
-       - Score 0.3 only if location is completely incompatible
-
-   - **Entity Match (When Present) - GENEROUS SCORING:**
-     - Analyze work experience section for comprehensive employment history
-     - If operator="AND": Score 1.0 if connected to most organizations, 0.8 if connected to some, 0.5 if any connection
-     - If operator="OR": Score 1.0 for ANY connection to listed organizations:
-       - Score 1.0 (Strong) if worked at any listed organization (check job titles and company names)
-       - Score 0.8 (Good) if worked at similar/related organizations in same industry
-       - Score 0.6 (Decent) if worked at organizations in same industry/category based on company descriptions
-       - Score 0.4 if worked at any notable organizations with relevant specialties
-       - Score 0.3 only if no relevant organizational experience found in work history
-     - Consider temporal context generously: "past" includes any previous role, "current" includes recent roles
-
-    - **Database Match (When Present) - GENEROUS SCORING:**
-       - Database queries specify exact field criteria (e.g., education.school, education.dates, accomplishments.Certifications)
-       - Check the relevant sections of the profile (education, accomplishments, work experience) for matches
-       - If operator="AND": Score 1.0 if most criteria satisfied, 0.8 if many satisfied, 0.5 if some satisfied
-       - If operator="OR": Score 1.0 if ANY database criteria reasonably met:
-         - Score 1.0 if profile clearly meets criteria (exact school match, graduation year match, certification match)
-         - Score 0.8 if profile mostly meets criteria (similar school, close graduation year, related certification)
-         - Score 0.6 if profile partially meets criteria (related education, similar background, adjacent qualifications)
-         - Score 0.4 if profile shows general qualifications in the area (broader education/experience)
-         - Score 0.3 only if no connection to criteria found in profile data
-
-    - **Sector Match (When Present) - GENEROUS SCORING:**
-       - Analyze work experience for company descriptions, specialties, and industry information
-       - If operator="AND": Score 1.0 if experience in most sectors, 0.8 if experience in some, 0.5 if any relevant experience
-       - If operator="OR": Score 1.0 for ANY reasonable sector connection:
-         - Score 1.0 if clear experience in any listed sector (company industry/specialties match)
-         - Score 0.8 if experience in closely related sectors (similar company descriptions)
-         - Score 0.6 if experience in adjacent/transferable sectors (related company types)
-         - Score 0.4 if experience in any relevant industry (broader company context)
-         - Score 0.3 only if no sector relevance found in work history
-       - Consider temporal context generously
-
-3. Final Score Calculation:
-   - Calculate weighted score (0-10) with generous interpretation
-   - **Aim for scores 7-10 for most profiles since they've already been pre-filtered**
-   - Score 9-10: Excellent matches with strong evidence
-   - Score 7-8: Good matches with solid evidence  
-   - Score 6-7: Decent matches with reasonable evidence
-   - Score 5-6: Acceptable matches with some evidence
-   - Below 5: Only if truly poor fit
-
-Output Format:
-<output>
-    <id>[Profile ID]</id>
-    <skillMatch>[1.0/0.8/0.6/0.5/0.3/null] (include only if skills are mentioned in query)</skillMatch>
-    <locationMatch>[1.0/0.8/0.6/0.5/0.3/null] (include only if location is mentioned in query)</locationMatch>
-    <entityMatch>[1.0/0.8/0.6/0.5/0.3/null] (include only if entity is mentioned in query)</entityMatch>
-    <databaseMatch>[1.0/0.8/0.6/0.5/0.3/null] (include only if database queries are mentioned in query)</databaseMatch>
-    <sectorMatch>[1.0/0.8/0.6/0.5/0.3/null] (include only if sectors are mentioned in query)</sectorMatch>
-    <recommendationScore>[0-10]</recommendationScore>
-    <skills>
-        <skill>[Matched Skill]</skill>
-        ...
-    </skills>
-</output>
-
-**Important Guidelines for Generous Scoring:**
-- **Be Generous:** Since profiles have already been filtered, look for ANY reasonable connection rather than perfect matches
-- **Rich Profile Data:** Leverage the comprehensive XML data including detailed work experience, education, accomplishments, and company information
-- **Conditional Field Inclusion:** Only include match fields if the corresponding section exists in `<hyde_analysis>` XML
-- **Skills Priority:** Skills get higher weight (40% when present) since they're typically the primary search criteria
-- **Expanded Score Range:** Use the full range 0.3-1.0 for better differentiation, with most scores in 0.6-1.0 range
-- **Temporal Context:** Be generous with temporal matching - "past" includes any previous experience, "current" includes recent roles
-- **Operator Logic:** For OR operators, give high scores if ANY criteria match. For AND operators, give good scores if most criteria match
-- **Database Queries:** Consider related/similar criteria as good matches, not just exact matches - check education, accomplishments sections
-- **Company Context:** Use detailed company descriptions and specialties to understand sector/industry relevance
-- **Target Score Range:** Aim for most profiles to score 7-10, since they've been pre-filtered for relevance
-- **Differentiation:** Use the nuanced scoring (1.0, 0.8, 0.6, etc.) to create meaningful differentiation while being generous overall
-"""
+# ``message`` (the prompt body in search_ranking.txt) and its parsed ``template`` are loaded on
+# first access, so importing this module does not read the prompt
+__getattr__ = lazy_prompt_attributes(__name__, "search_ranking.txt")
 
 commentOutReasoning = """<reasoning>[Brief explanation focusing only on factors mentioned in query and context]</reasoning>"""
@@ -0,0 +1,95 @@
+import re
+import sys
+from importlib.resources import files
+from typing import Callable, Dict, List, Tuple
+
+# Placeholders use the {{NAME}} form shared by every prompt in this package
+_PLACEHOLDER_PATTERN = re.compile(r"\{\{(\w+)\}\}")
+
+
+class PromptTemplate:
+    """Prompt text pre-split around its {{NAME}} placeholders.
+
+    The template is scanned once at construction; rendering joins the literal spans with
+    the supplied values in a single pass, so values are never re-scanned for placeholders.
+    This does the job of ``str.format_map`` without re-parsing the format string on every
+    call, and keeps the prompts' {{NAME}} syntax instead of bare-brace fields.
+    Renders stay ``str``: litellm takes message content as text and JSON-encodes the whole
+    request body itself, so pre-encoded byte spans could not be passed through.
+    """
+
+    def __init__(self, text: str):
+        literals: List[str] = []
+        names: List[str] = []
+        position = 0
+        for match in _PLACEHOLDER_PATTERN.finditer(text):
+            literals.append(text[position:match.start()])
+            # Interned so render()'s keyword lookups match on identity
+            names.append(sys.intern(match.group(1)))
+            position = match.end()
+        literals.append(text[position:])
+        self.literals: Tuple[str, ...] = tuple(literals)
+        self.names: Tuple[str, ...] = tuple(names)
+
+    @classmethod
+    def _from_parts(cls, literals: List[str], names: List[str]) -> "PromptTemplate":
+        template = cls.__new__(cls)
+        template.literals = tuple(literals)
+        template.names = tuple(names)
+        return template
+
+    def partial(self, **values: str) -> "PromptTemplate":
+        """Bake the given placeholders in and return a template over the remaining ones.
+
+        Used to fix per-query values once so each batch render only joins its own payload.
+        """
+        literals = [self.literals[0]]
+        names: List[str] = []
+        for name, literal in zip(self.names, self.literals[1:]):
+            if name in values:
+                literals[-1] += values[name] + literal
+            else:
+                names.append(name)
+                literals.append(literal)
+        return self._from_parts(literals, names)
+
+    def render(self, **values: str) -> str:
+        """Substitute every placeholder; raises KeyError if a value is missing."""
+        if len(self.names) == 1:
+            # The per-batch/per-profile partials leave exactly one placeholder
+            return "".join((self.literals[0], values[self.names[0]], self.literals[1]))
+        # Literal spans sit at even slots and values at odd ones, so no per-render scanning
+        parts = [""] * (2 * len(self.names) + 1)
+        parts[0::2] = self.literals
+        parts[1::2] = [values[name] for name in self.names]
+        return "".join(parts)
+
+    def render_split(self, **values: str) -> Tuple[str, str]:
+        """Render as ``(prefix, rest)`` split at the first placeholder.
+
+        The prefix is identical for every render of this template, so it can be sent as a
+        separate, cacheable content block ahead of the per-call values.
+        """
+        parts = [""] * (2 * len(self.names))
+        parts[0::2] = [values[name] for name in self.names]
+        parts[1::2] = self.literals[1:]
+        return self.literals[0], "".join(parts)
+
+
+def lazy_prompt_attributes(module_name: str, filename: str) -> Callable[[str], object]:
+    """Build a module ``__getattr__`` exposing ``message`` and ``template`` for a prompt file.
+
+    The prompt body is read from ``filename`` in this package and parsed on first access only.
+    """
+    loaded: Dict[str, object] = {}
+
+    def __getattr__(name: str) -> object:
+        if name not in ("message", "template"):
+            raise AttributeError(f"module {module_name!r} has no attribute {name!r}")
+        if not loaded:
+            text = files(__package__).joinpath(filename).read_text(encoding="utf-8")
+            loaded["message"] = text
+            loaded["template"] = PromptTemplate(text)
+        return loaded[name]
+
+    return __getattr__
@@ -1,20 +1,22 @@
 from logging_config import setup_logger
-from prompts.search_ranking import message
-import json
-import xml.etree.ElementTree as ET
+from prompts import search_ranking
+from prompts.template import PromptTemplate
+import orjson
+from xml.sax.saxutils import escape as xml_escape
 import re
 from typing import Any, List, Dict, Tuple, Optional
 import asyncio
-import aiofiles
 import time
 from datetime import datetime
 import math
 import os
 
-from api_client import fetch_nodes_by_ids, SearchServiceError
-from llm_helper import LLMManager
-from model_config import MODEL_CONFIGS
-import traceback
+from api_client import fetch_nodes_by_ids_cached, SearchServiceError
+from jsonToXml import json_to_xml
+from functools import lru_cache
+import hashlib
+from collections import OrderedDict
+from contextlib import nullcontext
 
 logger = setup_logger(__name__)
 # import logging
@@ -28,32 +30,23 @@ def convert_objectids_to_strings(obj):
     return obj
 
 
-def process_mutuals(mutual_ids):
-    """Fetch mutual connection metadata for the provided identifiers."""
-    if not mutual_ids:
-        return []
+_MUTUAL_PROJECTION = {"_id": 1, "name": 1, "avatarURL": 1}
+
 
+def _normalize_mutual_ids(mutual_ids) -> List[str]:
+    """Flatten raw mutual references (plain ids or Extended JSON ``$oid``) into id strings."""
     node_ids = []
-    for mid in mutual_ids:
+    for mid in mutual_ids or []:
         if isinstance(mid, dict) and "$oid" in mid:
             # Handle Extended JSON format
             node_ids.append(str(mid["$oid"]))
         elif mid:
             # Convert to string
             node_ids.append(str(mid))
+    return node_ids
 
-    if not node_ids:
-        return []
-
-    try:
-        mutual_map = fetch_nodes_by_ids(
-            node_ids,
-            projection={"_id": 1, "name": 1, "avatarURL": 1}
-        )
-    except SearchServiceError as exc:
-        logger.error("Failed to fetch mutual connections via API: %s", exc)
-        return []
 
+def _hydrate_mutuals(node_ids: List[str], mutual_map: Dict[str, Dict]) -> List[Dict]:
     results = []
     for node_id in node_ids:
         doc = mutual_map.get(node_id)
@@ -70,6 +63,30 @@ def process_mutuals(mutual_ids):
     return results
 
 
+def process_mutuals(mutual_ids):
+    """Fetch mutual connection metadata for the provided identifiers."""
+    return process_mutuals_bulk([mutual_ids])[0]
+
+
+def process_mutuals_bulk(mutual_id_lists: List[Any]) -> List[List[Dict]]:
+    """Resolve several candidates' mutuals with a single node fetch.
+
+    Returns one list of mutual metadata per input list, in the same order.
+    """
+    normalized_lists = [_normalize_mutual_ids(mutual_ids) for mutual_ids in mutual_id_lists]
+    unique_ids = list(dict.fromkeys(node_id for node_ids in normalized_lists for node_id in node_ids))
+    if not unique_ids:
+        return [[] for _ in normalized_lists]
+
+    try:
+        mutual_map = fetch_nodes_by_ids_cached(unique_ids, projection=_MUTUAL_PROJECTION)
+    except SearchServiceError as exc:
+        logger.error("Failed to fetch mutual connections via API: %s", exc)
+        return [[] for _ in normalized_lists]
+
+    return [_hydrate_mutuals(node_ids, mutual_map) for node_ids in normalized_lists]
+
+
 def analyze_hyde_data_requirements(hyde_result: dict) -> dict:
     """Determine which additional Mongo fields are needed for ranking."""
     required_fields = set()
@@ -102,6 +119,14 @@ def analyze_hyde_data_requirements(hyde_result: dict) -> dict:
     }
 
 
+# Legacy search match flags that are not carried onto enriched candidates
+_OBSOLETE_MATCH_FLAGS = frozenset({"matchedBoth", "matchedOrgOnly", "matchedSkillOnly", "matchedSectorOnly"})
+
+# currentWork summary fields taken from the latest work experience entry
+_CURRENT_WORK_FIELDS = ("companyName", "duration", "description", "location", "title")
+_EMPTY_CURRENT_WORK = dict.fromkeys(_CURRENT_WORK_FIELDS, "")
+
+
 def build_candidate_materials(candidates: List[Dict], hyde_result: dict) -> Dict[str, Any]:
     """Fetch Mongo documents and prepare data needed for ranking and output."""
     hyde_requirements = analyze_hyde_data_requirements(hyde_result)
@@ -146,7 +171,7 @@ def build_candidate_materials(candidates: List[Dict], hyde_result: dict) -> Dict
         base_projection[field] = 1
 
     try:
-        fetched_docs = fetch_nodes_by_ids(node_ids, projection=base_projection)
+        fetched_docs = fetch_nodes_by_ids_cached(node_ids, projection=base_projection)
     except SearchServiceError as exc:
         logger.error("Failed to fetch candidate materials via API: %s", exc)
         fetched_docs = {}
@@ -157,6 +182,16 @@ def build_candidate_materials(candidates: List[Dict], hyde_result: dict) -> Dict
         doc["_id"] = normalized_id
         mongo_docs[normalized_id] = doc
 
+    # Resolve every eligible candidate's mutuals in one request instead of one per candidate
+    mutual_owner_ids: List[str] = []
+    mutual_id_lists: List[Any] = []
+    for candidate in candidates:
+        doc = mongo_docs.get(candidate.get("nodeId"))
+        if doc and doc.get("scrapped"):
+            mutual_owner_ids.append(candidate.get("nodeId"))
+            mutual_id_lists.append(doc.get("mutual") or doc.get("contacts", {}).get("mutuals", []))
+    mutuals_by_pid = dict(zip(mutual_owner_ids, process_mutuals_bulk(mutual_id_lists)))
+
     enriched_list: List[Dict] = []
     enriched_map: Dict[str, Dict] = {}
     transformed_map: Dict[str, Dict] = {}
@@ -172,69 +207,55 @@ def build_candidate_materials(candidates: List[Dict], hyde_result: dict) -> Dict
             missing_ids.append(pid)
             continue
 
-        doc_clean = convert_objectids_to_strings(doc)
-        candidate_copy = convert_objectids_to_strings(candidate.copy())
-        for obsolete_flag in ("matchedBoth", "matchedOrgOnly", "matchedSkillOnly", "matchedSectorOnly"):
-            candidate_copy.pop(obsolete_flag, None)
+        candidate_copy = {key: value for key, value in candidate.items() if key not in _OBSOLETE_MATCH_FLAGS}
 
-        work_experience = doc_clean.get("workExperience", []) or []
+        work_experience = doc.get("workExperience", []) or []
+        # One currentWork dict per candidate, shared by the transformed and enriched entries
         if work_experience:
             first_exp = work_experience[0]
-            current_work = {
-                "companyName": first_exp.get("companyName", ""),
-                "duration": first_exp.get("duration", ""),
-                "description": first_exp.get("description", ""),
-                "location": first_exp.get("location", ""),
-                "title": first_exp.get("title", "")
-            }
+            current_work = {field: first_exp.get(field, "") for field in _CURRENT_WORK_FIELDS}
         else:
-            current_work = {
-                "companyName": "",
-                "duration": "",
-                "description": "",
-                "location": "",
-                "title": ""
-            }
+            current_work = _EMPTY_CURRENT_WORK.copy()
 
-        mutuals_raw = doc.get("mutual") or doc.get("contacts", {}).get("mutuals", [])
-        mutuals = process_mutuals(mutuals_raw)
+        mutuals = mutuals_by_pid.get(pid, [])
 
         transformed_person = {
             "nodeId": pid,
             "userId": candidate_copy.get("userId", ""),
-            "name": doc_clean.get("name", ""),
-            "aboutMe": doc_clean.get("about", ""),
-            "currentLocation": doc_clean.get("currentLocation", ""),
-            "avatarURL": doc_clean.get("avatarURL", ""),
+            "name": doc.get("name", ""),
+            "aboutMe": doc.get("about", ""),
+            "currentLocation": doc.get("currentLocation", ""),
+            "avatarURL": doc.get("avatarURL", ""),
             "mutuals": mutuals,
-            "linkedinHeadline": doc_clean.get("linkedinHeadline", ""),
-            "education": doc_clean.get("education", []),
-            "accomplishments": doc_clean.get("accomplishments", {}),
-            "volunteering": doc_clean.get("volunteering", []),
+            "linkedinHeadline": doc.get("linkedinHeadline", ""),
+            "education": doc.get("education", []),
+            "accomplishments": doc.get("accomplishments", {}),
+            "volunteering": doc.get("volunteering", []),
             "workExperience": work_experience,
             "currentWork": current_work
         }
 
         transformed_map[pid] = transformed_person
 
-        enriched_entry = {
-            **candidate_copy,
+        # candidate_copy is already a private filtered copy, so it is extended in place rather
+        # than spread into a second dict; key order matches the previous {**copy, ...} form
+        enriched_entry = candidate_copy
+        enriched_entry.update({
             "nodeId": pid,
             "type": "person",
-            "name": doc_clean.get("name", ""),
-            "stage": doc_clean.get("stage", ""),
-            "currentLocation": doc_clean.get("currentLocation", ""),
-            "connectionLevel": doc_clean.get("connectionLevel", ""),
-            "linkedinUsername": doc_clean.get("linkedinUsername", ""),
-            "linkedinHeadline": doc_clean.get("linkedinHeadline", ""),
-            "contacts": doc_clean.get("contacts", {}),
+            "name": doc.get("name", ""),
+            "stage": doc.get("stage", ""),
+            "currentLocation": doc.get("currentLocation", ""),
+            "connectionLevel": doc.get("connectionLevel", ""),
+            "linkedinUsername": doc.get("linkedinUsername", ""),
+            "linkedinHeadline": doc.get("linkedinHeadline", ""),
+            "contacts": doc.get("contacts", {}),
             "currentWork": current_work,
-            "avatarURL": doc_clean.get("avatarURL", ""),
+            "avatarURL": doc.get("avatarURL", ""),
             "mutuals": mutuals,
             "score": None
-        }
+        })
 
-        enriched_entry = convert_objectids_to_strings(enriched_entry)
         enriched_list.append(enriched_entry)
         enriched_map[pid] = enriched_entry
 
@@ -250,13 +271,22 @@ def build_candidate_materials(candidates: List[Dict], hyde_result: dict) -> Dict
     }
 
 
+def _fingerprint_for_index(index: int) -> str:
+    """Bijective base-26 label for ``index``: a..z, aa..az, ba..zz, aaa, ..."""
+    label = ""
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        label = chr(97 + remainder) + label
+    return label
+
+
 class FingerprintMapper:
     def __init__(self):
         self._map = {}
         self._reverse_map = {}
-        self._current_char = 'a'
+        self._counter = 0
         self._lock = asyncio.Lock()
-        self._debug_log = []
         logger.info("Initialized FingerprintMapper")
 
     async def get_fingerprint(self, name: str) -> str:
@@ -265,32 +295,21 @@ class FingerprintMapper:
             logger.warning("Empty name provided for fingerprint generation")
             return ""
 
+        # Lock-free fast path: the map is only mutated on this event loop, so a hit is safe to
+        # return without serializing on the lock
+        fingerprint = self._map.get(name)
+        if fingerprint is not None:
+            return fingerprint
+
         async with self._lock:
             if name in self._map:
-                logger.debug(
-                    f"Existing fingerprint found for '{name}': {self._map[name]}")
                 return self._map[name]
 
-            fingerprint = self._current_char
+            fingerprint = _fingerprint_for_index(self._counter)
+            self._counter += 1
             self._map[name] = fingerprint
             self._reverse_map[fingerprint] = name
-            logger.debug(
-                f"Created new fingerprint for '{name}': {fingerprint}")
-
-            # Move to next character
-            if self._current_char == 'z':
-                self._current_char = 'aa'
-            else:
-                if len(self._current_char) == 1:
-                    self._current_char = chr(ord(self._current_char) + 1)
-                else:
-                    last_char = self._current_char[-1]
-                    if last_char == 'z':
-                        self._current_char = self._current_char[:-
-                                                                1] + 'a' + 'a'
-                    else:
-                        self._current_char = self._current_char[:-1] + chr(
-                            ord(last_char) + 1)
+            logger.debug("Created new fingerprint for '%s': %s", name, fingerprint)
 
             return fingerprint
 
@@ -300,78 +319,79 @@ class FingerprintMapper:
 
     async def replace_fingerprints_in_results(self, results: List[Dict], original_data: List[Dict]) -> List[Dict]:
         """Replace fingerprints with original data in the results."""
-        async with self._lock:
-            updated_results = []
-            for result in results:
-                result_copy = result.copy()
-                fingerprint = result_copy.get('id')
-
-                if fingerprint in self._reverse_map:
-                    node_id = self._reverse_map[fingerprint]
-
-                    # Find original person data
-                    original_person = next(
-                        (p for p in original_data if p.get(
-                            'nodeId') == node_id),
-                        None
-                    )
-
-                    if original_person:
-                        result_copy['nodeId'] = node_id
-                        result_copy['userId'] = original_person.get(
-                            'userId', '')
-                        result_copy['name'] = original_person.get('name', '')
-                        del result_copy['id']
-                    else:
-                        logger.warning(
-                            f"No original data found for {node_id}")
+        # No await below, so reads of the reverse map cannot interleave with inserts; no lock needed
+        person_index = {p.get('nodeId'): p for p in original_data}
+        updated_results = []
+        for result in results:
+            result_copy = result.copy()
+            fingerprint = result_copy.get('id')
+
+            if fingerprint in self._reverse_map:
+                node_id = self._reverse_map[fingerprint]
+
+                # Find original person data
+                original_person = person_index.get(node_id)
+
+                if original_person:
+                    result_copy['nodeId'] = node_id
+                    result_copy['userId'] = original_person.get(
+                        'userId', '')
+                    result_copy['name'] = original_person.get('name', '')
+                    del result_copy['id']
                 else:
                     logger.warning(
-                        f"No mapping found for fingerprint {fingerprint}")
+                        f"No original data found for {node_id}")
+            else:
+                logger.warning(
+                    f"No mapping found for fingerprint {fingerprint}")
 
-                updated_results.append(result_copy)
+            updated_results.append(result_copy)
 
-            return updated_results
+        return updated_results
 
-    async def _save_debug_logs(self):
-        """Save fingerprint mapping debug logs to file."""
-        try:
-            debug_folder = "debug_logs"
-            os.makedirs(debug_folder, exist_ok=True)
-
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            async with aiofiles.open(f"{debug_folder}/fingerprint_mapping_{timestamp}.log", 'w') as f:
-                await f.write("\n".join(self._debug_log))
-                await f.write("\n\nCurrent Maps:\n")
-                await f.write(f"Forward Map: {json.dumps(self._map, indent=2)}\n")
-                await f.write(f"Reverse Map: {json.dumps(self._reverse_map, indent=2)}")
-
-            # Clear the log after saving
-            self._debug_log = []
-            logger.info(
-                f"Debug logs saved to fingerprint_mapping_{timestamp}.log")
 
-        except Exception as e:
-            logger.error(f"Error saving fingerprint debug logs: {str(e)}")
+# Warm containers re-rank overlapping candidate sets, so each profile's XML body is kept
+# keyed by nodeId and a digest of the fields it was rendered from
+PROFILE_XML_CACHE_MAX_ENTRIES = 2_000
+_profile_xml_cache: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
+
+
+def _profile_xml_body(node_id: str, person_data_for_xml: Dict[str, Any]) -> str:
+    """Children of the person's jsonToXml <profile> element, memoized per profile content."""
+    digest = hashlib.blake2b(
+        orjson.dumps(person_data_for_xml, default=str,
+                     option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS),
+        digest_size=16,
+    ).hexdigest()
+    key = (node_id, digest)
+    body = _profile_xml_cache.get(key)
+    if body is not None:
+        _profile_xml_cache.move_to_end(key)
+        return body
+
+    # jsonToXml output is already serialized and well-formed, so its children are spliced in
+    # by stripping the outer <profile> tag rather than re-parsing
+    rich_xml_str = json_to_xml(person_data_for_xml)
+    profile_end = rich_xml_str.rfind("</profile>")
+    body = rich_xml_str[rich_xml_str.find(">") + 1:profile_end].lstrip() if profile_end != -1 else ""
+
+    _profile_xml_cache[key] = body
+    if len(_profile_xml_cache) > PROFILE_XML_CACHE_MAX_ENTRIES:
+        _profile_xml_cache.popitem(last=False)
+    return body
 
 
 async def convert_persons_to_xml(persons: List[Dict], fingerprint_mapper: FingerprintMapper) -> str:
     """Convert a list of persons' data to XML format using jsonToXml.py for rich profile data."""
-    from jsonToXml import json_to_xml
-    
-    root = ET.Element("listOfPerson")
+    parts = ["<listOfPerson>"]
 
     for person in persons:
         # Get fingerprint derived from the candidate's node ID
         original_id = person.get("nodeId", "")
         fingerprint = await fingerprint_mapper.get_fingerprint(original_id)
 
-        # Create person wrapper with fingerprint ID
-        person_wrapper = ET.SubElement(root, "person")
-        
-        # Add fingerprint ID
-        id_elem = ET.SubElement(person_wrapper, "id")
-        id_elem.text = fingerprint
+        # Person wrapper with fingerprint ID
+        parts.append(f"<person><id>{xml_escape(fingerprint)}</id>")
 
         # Use jsonToXml to convert the person data to rich XML
         # We need to prepare the person data in the expected format for jsonToXml
@@ -386,43 +406,45 @@ async def convert_persons_to_xml(persons: List[Dict], fingerprint_mapper: Finger
             "volunteering": person.get("volunteering", [])
         }
 
-        # Generate rich XML using jsonToXml
-        rich_xml_str = json_to_xml(person_data_for_xml)
-        
-        # Parse the generated XML and append its content (excluding the root <profile> tag)
-        try:
-            rich_xml_root = ET.fromstring(rich_xml_str)
-            # Copy all child elements from the rich XML to our person wrapper
-            for child in rich_xml_root:
-                person_wrapper.append(child)
-        except ET.ParseError as e:
-            logger.error(f"Error parsing rich XML for person {original_id}: {str(e)}")
-            # Fallback to basic info if XML parsing fails
-            about = ET.SubElement(person_wrapper, "about")
-            about.text = person.get("aboutMe", "")
-            
-            location = ET.SubElement(person_wrapper, "currentLocation")
-            location.text = person.get("currentLocation", "")
-
-    return ET.tostring(root, encoding='unicode', method='xml')
-
-
-async def extract_skills_from_output(output_text: str) -> List[str]:
+        # Generate rich XML using jsonToXml (cached across batches and warm invocations)
+        parts.append(_profile_xml_body(original_id, person_data_for_xml))
+
+        parts.append("</person>")
+
+    parts.append("</listOfPerson>")
+    return "".join(parts)
+
+
+# Patterns for parsing ranking responses, compiled once rather than per output block and tag
+_OUTPUT_BLOCK_PATTERN = re.compile(r'<output>\s*(.*?)\s*</output>', re.DOTALL)
+_SKILL_PATTERN = re.compile(r'<skill>(.*?)</skill>')
+_SCORE_TAG_PATTERNS = {
+    tag: re.compile(f'<{tag}>(.*?)</{tag}>', re.DOTALL)
+    for tag in ('id', 'skillMatch', 'locationMatch', 'entityMatch', 'databaseMatch', 'sectorMatch', 'recommendationScore')
+}
+_MATCH_TAGS = frozenset(('skillMatch', 'locationMatch', 'entityMatch', 'databaseMatch', 'sectorMatch'))
+# Literal values the model emits for any tag, keyed by their lowercased form
+_CONSTANT_TAG_VALUES = {
+    '1': 1, '[1]': 1, '1.0': 1,
+    '0': 0, '[0]': 0, '0.0': 0,
+    '0.5': 0.5, '[0.5]': 0.5,
+    'null': None, '[null]': None, 'none': None,
+}
+_NOT_CONSTANT = object()
+
+
+def extract_skills_from_output(output_text: str) -> List[str]:
     """Extract skills from the output XML."""
-    skills = []
-    pattern = r'<skill>(.*?)</skill>'
-    matches = re.finditer(pattern, output_text)
-    return [match.group(1) for match in matches]
+    return [match.group(1) for match in _SKILL_PATTERN.finditer(output_text)]
 
 
-async def extract_score_data(response_text: str) -> List[Dict]:
+def extract_score_data(response_text: str) -> List[Dict]:
     """Extract and parse all profile outputs from the response."""
     logger.info("Starting data extraction from response")
     results = []
 
     try:
-        output_pattern = r'<output>\s*(.*?)\s*</output>'
-        outputs = list(re.finditer(output_pattern, response_text, re.DOTALL))
+        outputs = list(_OUTPUT_BLOCK_PATTERN.finditer(response_text))
         logger.info(f"Found {len(outputs)} output blocks in response")
 
         for i, output in enumerate(outputs, 1):
@@ -430,26 +452,20 @@ async def extract_score_data(response_text: str) -> List[Dict]:
                 output_text = output.group(1)
                 logger.info(f"Processing output block {i}/{len(outputs)}")
 
-                async def extract_value(tag: str) -> str:
-                    pattern = f'<{tag}>(.*?)</{tag}>'
-                    match = re.search(pattern, output_text, re.DOTALL)
+                def extract_value(tag: str) -> str:
+                    match = _SCORE_TAG_PATTERNS[tag].search(output_text)
                     if not match:
                         logger.warning(
                             f"Warning: No match found for tag '{tag}'")
-                        return None if tag in ['skillMatch', 'locationMatch', 'entityMatch', 'databaseMatch', 'sectorMatch'] else ""
+                        return None if tag in _MATCH_TAGS else ""
 
                     value = match.group(1).strip()
                     return convert_value(value, tag)
 
                 def convert_value(value: str, tag: str):
-                    if value in ['1', '[1]', '1.0']:
-                        return 1
-                    elif value in ['0', '[0]', '0.0']:
-                        return 0
-                    elif value in ['0.5', '[0.5]']:
-                        return 0.5
-                    elif value.lower() in ['null', '[null]', 'none']:
-                        return None
+                    constant = _CONSTANT_TAG_VALUES.get(value.lower(), _NOT_CONSTANT)
+                    if constant is not _NOT_CONSTANT:
+                        return constant
                     elif tag == 'recommendationScore':
                         try:
                             return float(value.strip('[]'))
@@ -457,7 +473,7 @@ async def extract_score_data(response_text: str) -> List[Dict]:
                             logger.warning(
                                 f"Warning: Could not convert score '{value}' to float")
                             return 0.0
-                    elif tag in ['skillMatch', 'locationMatch', 'entityMatch', 'databaseMatch', 'sectorMatch']:
+                    elif tag in _MATCH_TAGS:
                         # Handle any numeric value for match fields
                         try:
                             return float(value.strip('[]'))
@@ -468,15 +484,15 @@ async def extract_score_data(response_text: str) -> List[Dict]:
                     return value.strip('[]').strip()
 
                 result = {
-                    "id": await extract_value("id"),  # Changed from name to id
-                    "skillMatch": await extract_value("skillMatch"),
-                    "locationMatch": await extract_value("locationMatch"),
-                    "entityMatch": await extract_value("entityMatch"),
-                    "databaseMatch": await extract_value("databaseMatch"),
-                    "sectorMatch": await extract_value("sectorMatch"),
-                    "recommendationScore": await extract_value("recommendationScore"),
-                    # "reasoning": await extract_value("reasoning"),
-                    "skills": await extract_skills_from_output(output_text)
+                    "id": extract_value("id"),  # Changed from name to id
+                    "skillMatch": extract_value("skillMatch"),
+                    "locationMatch": extract_value("locationMatch"),
+                    "entityMatch": extract_value("entityMatch"),
+                    "databaseMatch": extract_value("databaseMatch"),
+                    "sectorMatch": extract_value("sectorMatch"),
+                    "recommendationScore": extract_value("recommendationScore"),
+                    # "reasoning": extract_value("reasoning"),
+                    "skills": extract_skills_from_output(output_text)
                 }
 
                 logger.info(f"Successfully extracted data for profile {i}")
@@ -498,52 +514,74 @@ async def extract_score_data(response_text: str) -> List[Dict]:
     return results
 
 
+# Same entities ElementTree emits for attribute values
+_XML_ATTR_ENTITIES = {'"': "&quot;", "\n": "&#10;", "\r": "&#13;", "\t": "&#09;"}
+
+
+def _xml_attrs(attrs: Dict[str, str]) -> str:
+    return "".join(f' {name}="{xml_escape(value, _XML_ATTR_ENTITIES)}"' for name, value in attrs.items())
+
+
+def _xml_element(tag: str, text: Optional[str]) -> str:
+    # ElementTree collapses an element without text to the self-closing form
+    return f"<{tag}>{xml_escape(text)}</{tag}>" if text else f"<{tag} />"
+
+
+def _xml_list(tag: str, attrs: Dict[str, str], child_tag: str, values: List[str]) -> str:
+    children = "".join(_xml_element(child_tag, value) for value in values)
+    return f"<{tag}{_xml_attrs(attrs)}>{children}</{tag}>" if children else f"<{tag}{_xml_attrs(attrs)} />"
+
+
 def convert_hyde_details_to_xml(details: Optional[Dict]) -> str:
-    """Converts the hyde_analysis_flags dict to an XML string for the prompt."""
-    logger.info(f"Converting hyde details to XML")
+    """Converts the hyde_analysis_flags dict to an XML string for the prompt.
+
+    Built directly as text rather than through ElementTree; the output matches
+    ``ElementTree.tostring`` for this fixed schema. Rendered XML is cached per distinct
+    flags content, so warm invocations for a repeated HyDE analysis skip the rebuild.
+    """
     if not details:
         return "<hyde_analysis />"  # Return empty tag if no details
+    return _hyde_details_xml(orjson.dumps(details, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS))
 
-    root = ET.Element("hyde_analysis")
+
+@lru_cache(maxsize=256)
+def _hyde_details_xml(details_json: bytes) -> str:
+    # Keyed by canonical JSON since the flags dict itself is unhashable
+    logger.info("Converting hyde details to XML")
+    details = orjson.loads(details_json)
+    out: List[str] = []
 
     if details.get("locations"):
         # Add operator attribute to the parent tag
-        locs_elem = ET.SubElement(
-            root, "locations", operator=details.get("location_operator", "AND"))
-        for loc in details["locations"]:
-            loc_elem = ET.SubElement(locs_elem, "location")
-            loc_elem.text = loc
+        out.append(_xml_list(
+            "locations", {"operator": details.get("location_operator", "AND")},
+            "location", details["locations"]))
 
     if details.get("organizations"):
         # Add operator attribute and temporal information to the parent tag
         org_attrs = {"operator": details.get("organization_operator", "AND")}
         if details.get("organization_temporal"):
             org_attrs["temporal"] = details.get("organization_temporal")
-        orgs_elem = ET.SubElement(root, "organizations", **org_attrs)
-        for org in details["organizations"]:
-            org_elem = ET.SubElement(orgs_elem, "organization")
-            org_elem.text = org
+        out.append(_xml_list("organizations", org_attrs, "organization", details["organizations"]))
 
     if details.get("skills"):
         # Add operator attribute to the parent tag
-        skills_elem = ET.SubElement(
-            root, "skills", operator=details.get("skill_operator", "AND"))
-        for skill in details["skills"]:
-            skill_elem = ET.SubElement(skills_elem, "skill")
-            skill_elem.text = skill
+        out.append(_xml_list(
+            "skills", {"operator": details.get("skill_operator", "AND")},
+            "skill", details["skills"]))
 
     # Add database queries section if present - NOW AT TOP LEVEL
     if details.get("db_queries"):
-        db_elem = ET.SubElement(
-            root, "database_queries", operator=details.get("db_query_operator", "AND"))
-        for query in details["db_queries"]:
-            query_elem = ET.SubElement(db_elem, "query")
-
-            field_elem = ET.SubElement(query_elem, "field")
-            field_elem.text = query.get("field", "")
-
-            desc_elem = ET.SubElement(query_elem, "description")
-            desc_elem.text = query.get("description", "")
+        queries = "".join(
+            "<query>"
+            + _xml_element("field", query.get("field", ""))
+            + _xml_element("description", query.get("description", ""))
+            + "</query>"
+            for query in details["db_queries"]
+        )
+        out.append(
+            f'<database_queries{_xml_attrs({"operator": details.get("db_query_operator", "AND")})}>'
+            f"{queries}</database_queries>")
 
     # Add sectors section if present (new feature)
     if details.get("sectors"):
@@ -551,70 +589,81 @@ def convert_hyde_details_to_xml(details: Optional[Dict]) -> str:
         sector_attrs = {"operator": details.get("sector_operator", "OR")}
         if details.get("sector_temporal"):
             sector_attrs["temporal"] = details.get("sector_temporal")
-        sectors_elem = ET.SubElement(root, "sectors", **sector_attrs)
-        for sector in details["sectors"]:
-            sector_elem = ET.SubElement(sectors_elem, "sector")
-            sector_elem.text = sector
+        out.append(_xml_list("sectors", sector_attrs, "sector", details["sectors"]))
 
-    # If root has no children, return empty tag, otherwise return string
-    if not list(root):
+    # If no section was emitted, return empty tag, otherwise return string
+    if not out:
         return "<hyde_analysis />"
-    return ET.tostring(root, encoding='unicode', method='xml')
+    return "<hyde_analysis>" + "".join(out) + "</hyde_analysis>"
+
+
+def build_batch_prompt_template(query: str, hyde_analysis_flags: Optional[Dict]) -> PromptTemplate:
+    """Ranking prompt with everything but the per-batch persons XML filled in."""
+    return search_ranking.template.partial(
+        QUERY=query,
+        HYDE_ANALYSIS_XML=convert_hyde_details_to_xml(hyde_analysis_flags),
+        CURRENT_DATE=datetime.now().strftime("%Y-%m-%d"),
+    )
 
 
 async def process_batch(persons: List[Dict], query: str,
-                        fingerprint_mapper: FingerprintMapper, hyde_analysis_flags: dict = None, max_retries: int = 3, reasoning_model: str = "anthropic_haiku") -> List[Dict]:
-    """Process a batch of persons and return their rankings."""
+                        fingerprint_mapper: FingerprintMapper, hyde_analysis_flags: dict = None, max_retries: int = 3, reasoning_model: str = "anthropic_haiku",
+                        prompt_template: Optional[PromptTemplate] = None,
+                        llm_semaphore: Optional[asyncio.Semaphore] = None) -> List[Dict]:
+    """Process a batch of persons and return their rankings.
+
+    ``prompt_template`` may carry the query, HyDE XML and date already baked in (see
+    ``build_batch_prompt_template``); otherwise they are rendered here for this batch.
+    ``llm_semaphore`` bounds only the completion call, so retry backoff does not hold a slot.
+    """
     batch_id = str(hash(frozenset([p["nodeId"] for p in persons])))
 
     try:
         logger.info(
-            f"\n[{datetime.now()}] Starting batch {batch_id} with {len(persons)} persons")
+            f"\nStarting batch {batch_id} with {len(persons)} persons")
 
         # Convert persons to XML format
         try:
             persons_xml = await convert_persons_to_xml(persons, fingerprint_mapper)
-            # Count number of person elements in XML
-            person_count = persons_xml.count("<person>")
+            # convert_persons_to_xml emits exactly one <person> element per input person
+            person_count = len(persons)
             logger.info(
-                f"[{datetime.now()}] Successfully converted {person_count} persons to XML format")
+                f"Successfully converted {person_count} persons to XML format")
         except Exception as e:
             logger.error(
-                f"[{datetime.now()}] Error converting persons to XML: {str(e)}")
+                f"Error converting persons to XML: {str(e)}")
             raise
 
-        # Convert hyde details to XML
-        hyde_analysis_xml = convert_hyde_details_to_xml(hyde_analysis_flags)
+        if prompt_template is None:
+            prompt_template = build_batch_prompt_template(query, hyde_analysis_flags)
 
-        current_date = datetime.now().strftime("%Y-%m-%d")
-        prompt = message.replace("{{LIST_OF_PERSONS}}", persons_xml)\
-                        .replace("{{QUERY}}", query)\
-                        .replace("{{HYDE_ANALYSIS_XML}}", hyde_analysis_xml)\
-                        .replace("{{CURRENT_DATE}}", current_date)
+        # Deferred so ranking-free invocations never pay the LLM SDK import cost
+        from llm_helper import get_llm_manager
+        model = get_llm_manager()
+
+        prompt = prompt_template.render(LIST_OF_PERSONS=persons_xml)
         for attempt in range(max_retries):
             try:
                 logger.info(
-                    f"[{datetime.now()}] Making API call for batch {batch_id} (attempt {attempt + 1}/{max_retries}) with {person_count} profiles")
-                model = LLMManager()
+                    f"Making API call for batch {batch_id} (attempt {attempt + 1}/{max_retries}) with {person_count} profiles")
                 # Store input prompt locally for debugging
                 # debug_folder = "debug_logs"
                 # os.makedirs(debug_folder, exist_ok=True)
                 # timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                # async with aiofiles.open(f"{debug_folder}/input_prompt_{batch_id}_{timestamp}.txt", 'w') as f:
-                #     await f.write(prompt)
-
-                response = await model.get_completion(
-                    provider=reasoning_model,  # Use the provider key from your MODEL_CONFIGS
-                    messages=[
-                        {"role": "user",
-                         "content": prompt},
-                    ]
-                )
+                # await asyncio.to_thread(_write_file_bytes, f"{debug_folder}/input_prompt_{batch_id}_{timestamp}.txt", prompt.encode())
+
+                async with llm_semaphore or nullcontext():
+                    response = await model.get_completion(
+                        provider=reasoning_model,  # Use the provider key from your MODEL_CONFIGS
+                        messages=[
+                            {"role": "user",
+                             "content": prompt},
+                        ]
+                    )
                 response_text = response.choices[0].message.content
 
                 # Store LLM response locally for debugging
-                # async with aiofiles.open(f"{debug_folder}/llm_response_{batch_id}_{timestamp}.txt", 'w') as f:
-                #     await f.write(response_text)
+                # await asyncio.to_thread(_write_file_bytes, f"{debug_folder}/llm_response_{batch_id}_{timestamp}.txt", response_text.encode())
 
                 break
             except Exception as e:
@@ -622,61 +671,56 @@ async def process_batch(persons: List[Dict], query: str,
                 if attempt < max_retries - 1:
                     wait_time = 2 ** attempt
                     logger.info(
-                        f"[{datetime.now()}] Attempt {attempt + 1} failed: {str(e)}. Waiting {wait_time} seconds...")
+                        f"Attempt {attempt + 1} failed: {str(e)}. Waiting {wait_time} seconds...")
                     await asyncio.sleep(wait_time)
                 else:
                     logger.error(
-                        f"[{datetime.now()}] All attempts failed for batch {batch_id}")
+                        f"All attempts failed for batch {batch_id}")
                     raise last_error
 
         if not response_text:
             logger.warning(
-                f"[{datetime.now()}] Warning: Empty response received for batch {batch_id}")
+                f"Warning: Empty response received for batch {batch_id}")
             return []
 
         logger.info(
-            f"[{datetime.now()}] Processing response text of length {len(response_text)}")
+            f"Processing response text of length {len(response_text)}")
 
         # Extract data from response
-        results = await extract_score_data(response_text)
+        results = extract_score_data(response_text)
         if not results:
             logger.warning(
-                f"[{datetime.now()}] Warning: No results extracted from response for batch {batch_id}")
+                f"Warning: No results extracted from response for batch {batch_id}")
             return []
 
         # Store extracted results locally for debugging
-        # async with aiofiles.open(f"{debug_folder}/extracted_results_{batch_id}_{timestamp}.json", 'w') as f:
-        #     await f.write(json.dumps(results, indent=2))
+        # await asyncio.to_thread(_write_file_bytes, f"{debug_folder}/extracted_results_{batch_id}_{timestamp}.json", orjson.dumps(results, option=orjson.OPT_INDENT_2))
 
         # Replace fingerprints with original names
         try:
             results = await fingerprint_mapper.replace_fingerprints_in_results(results, persons)
             logger.info(
-                f"[{datetime.now()}] Successfully processed {len(results)}/{person_count} profiles for batch {batch_id}")
+                f"Successfully processed {len(results)}/{person_count} profiles for batch {batch_id}")
 
             # Store final results after fingerprint replacement for debugging
-            # async with aiofiles.open(f"{debug_folder}/final_results_{batch_id}_{timestamp}.json", 'w') as f:
-            #     await f.write(json.dumps(results, indent=2))
+            # await asyncio.to_thread(_write_file_bytes, f"{debug_folder}/final_results_{batch_id}_{timestamp}.json", orjson.dumps(results, option=orjson.OPT_INDENT_2))
 
         except Exception as e:
             logger.error(
-                f"[{datetime.now()}] Error replacing fingerprints: {str(e)}")
+                f"Error replacing fingerprints: {str(e)}")
             raise
 
         # If we got fewer results than input profiles, log a warning
         if len(results) < person_count:
             logger.warning(
-                f"[{datetime.now()}] Warning: Missing results for {person_count - len(results)} profiles in batch {batch_id}")
+                f"Warning: Missing results for {person_count - len(results)} profiles in batch {batch_id}")
 
         logger.info(
-            f"[{datetime.now()}] Successfully completed batch {batch_id}")
+            f"Successfully completed batch {batch_id}")
         return results
 
     except Exception as e:
-        logger.critical(
-            f"[{datetime.now()}] Critical error in batch {batch_id}: {str(e)}")
-        logger.warning(f"[{datetime.now()}] Traceback:")
-        traceback.print_exc()
+        logger.critical("Critical error in batch %s: %s", batch_id, e, exc_info=True)
 
         # Save error information
         # try:
@@ -692,16 +736,21 @@ async def process_batch(persons: List[Dict], query: str,
         #     }
 
         #     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        #     async with aiofiles.open(f"{debug_folder}/error_{batch_id}_{timestamp}.json", 'w') as f:
-        #         await f.write(json.dumps(error_info, indent=2))
+        #     await asyncio.to_thread(_write_file_bytes, f"{debug_folder}/error_{batch_id}_{timestamp}.json", orjson.dumps(error_info, option=orjson.OPT_INDENT_2))
         # except Exception as log_error:
         #     logger.error(
-        #         f"[{datetime.now()}] Failed to save error information: {str(log_error)}")
+        #         f"Failed to save error information: {str(log_error)}")
 
         return []
 
 
-async def chunk_list(lst: List, chunk_size: int) -> List[List]:
+def recommendation_score_key(result: Dict) -> float:
+    """Sort key for ranked results; a null score from the model sorts last instead of raising."""
+    score = result.get('recommendationScore')
+    return -1.0 if score is None else score
+
+
+def chunk_list(lst: List, chunk_size: int) -> List[List]:
     """Split a list into chunks of specified size."""
     return [lst[i:i + chunk_size] for i in range(0, len(lst), chunk_size)]
 
@@ -711,7 +760,7 @@ async def process_people_direct(transformed_people: List[Dict], query: str, reas
     try:
         start_time = time.time()
         logger.info(
-            f"[{datetime.now()}] Starting direct processing of {len(transformed_people)} people")
+            f"Starting direct processing of {len(transformed_people)} people")
 
         fingerprint_mapper = FingerprintMapper()
         # Store transformed_people as JSON for debugging
@@ -725,71 +774,68 @@ async def process_people_direct(transformed_people: List[Dict], query: str, reas
         #     hyde_analysis_flags_path = os.path.join(
         #         debug_folder, f"hyde_analysis_flags_{timestamp}.json")
 
-        #     async with aiofiles.open(debug_file_path, 'w') as f:
-        #         await f.write(json.dumps(transformed_people, indent=2))
+        #     await asyncio.to_thread(_write_file_bytes, debug_file_path, orjson.dumps(transformed_people, option=orjson.OPT_INDENT_2))
 
-        #     async with aiofiles.open(hyde_analysis_flags_path, 'w') as f:
-        #         await f.write(json.dumps(hyde_analysis_flags, indent=2))
+        #     await asyncio.to_thread(_write_file_bytes, hyde_analysis_flags_path, orjson.dumps(hyde_analysis_flags, option=orjson.OPT_INDENT_2))
 
         #     logger.info(
-        #         f"[{datetime.now()}] Saved {len(transformed_people)} transformed people to {debug_file_path}")
+        #         f"Saved {len(transformed_people)} transformed people to {debug_file_path}")
         # except Exception as e:
         #     logger.error(
-        #         f"[{datetime.now()}] Failed to save transformed people: {str(e)}")
+        #         f"Failed to save transformed people: {str(e)}")
 
         # # Create batches
-        batches = await chunk_list(transformed_people, batch_size)
-        logger.info(f"[{datetime.now()}] Created {len(batches)} batches")
+        batches = chunk_list(transformed_people, batch_size)
+        logger.info(f"Created {len(batches)} batches")
+
+        # Query, HyDE XML and date are identical for every batch; only the persons XML varies
+        batch_prompt_template = build_batch_prompt_template(query, hyde_analysis_flags)
 
-        # Process batches with concurrency control and retries
+        # Process batches concurrently; the semaphore caps in-flight completions, not whole
+        # batches, so a batch sleeping through retry backoff leaves its slot to the others
         sem = asyncio.Semaphore(max_concurrent_tasks)
 
-        async def process_batch_with_semaphore(batch):
-            async with sem:
-                try:
-                    result = await process_batch(batch, query, fingerprint_mapper, hyde_analysis_flags=hyde_analysis_flags, max_retries=3, reasoning_model=reasoning_model)
-                    if not result:
-                        logger.warning(
-                            f"[{datetime.now()}] Warning: Empty result for batch with {len(batch)} people")
-                    return result
-                except Exception as e:
-                    logger.error(
-                        f"[{datetime.now()}] Error processing batch: {str(e)}")
-                    traceback.print_exc()
-                    return []
+        # Each batch records and logs its results as soon as it finishes; results are slotted
+        # by batch index so the order of equal scores stays deterministic
+        batch_results: List[List[Dict]] = [[] for _ in batches]
+
+        async def process_batch_with_semaphore(index, batch):
+            try:
+                result = await process_batch(batch, query, fingerprint_mapper, hyde_analysis_flags=hyde_analysis_flags, max_retries=3, reasoning_model=reasoning_model, prompt_template=batch_prompt_template, llm_semaphore=sem)
+                if not result:
+                    logger.warning("Warning: Empty result for batch with %d people", len(batch))
+            except Exception as e:
+                logger.exception("Error processing batch: %s", e)
+                result = []
+            batch_results[index] = result
+            logger.info("Batch %d/%d returned %d results", index + 1, len(batches), len(result))
 
-        tasks = [process_batch_with_semaphore(batch) for batch in batches]
-        batch_results = await asyncio.gather(*tasks)
+        # A TaskGroup scopes the batch tasks to this call: batch errors are handled above, and
+        # anything that escapes (e.g. cancellation of the invocation) cancels the remaining batches
+        async with asyncio.TaskGroup() as task_group:
+            for i, batch in enumerate(batches):
+                task_group.create_task(process_batch_with_semaphore(i, batch))
 
-        # Collect and log results
-        results = []
-        for i, batch_result in enumerate(batch_results):
-            results.extend(batch_result)
-            logger.info(
-                f"[{datetime.now()}] Batch {i+1}/{len(batches)} returned {len(batch_result)} results")
+        results = [result for batch_result in batch_results for result in batch_result]
 
         logger.info(
-            f"[{datetime.now()}] Total results: {len(results)} out of {len(transformed_people)} input people")
+            f"Total results: {len(results)} out of {len(transformed_people)} input people")
 
         # Store final aggregated results for debugging
-        final_results = sorted(results, key=lambda x: x.get(
-            'recommendationScore', 0), reverse=True)
+        final_results = sorted(results, key=recommendation_score_key, reverse=True)
         # try:
         #     final_timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        #     async with aiofiles.open(f"debug_logs/final_aggregated_results_{final_timestamp}.json", 'w') as f:
-        #         await f.write(json.dumps(final_results, indent=2))
+        #     await asyncio.to_thread(_write_file_bytes, f"debug_logs/final_aggregated_results_{final_timestamp}.json", orjson.dumps(final_results, option=orjson.OPT_INDENT_2))
         #     logger.info(
-        #         f"[{datetime.now()}] Saved final aggregated results to debug_logs/final_aggregated_results_{final_timestamp}.json")
+        #         f"Saved final aggregated results to debug_logs/final_aggregated_results_{final_timestamp}.json")
         # except Exception as e:
         #     logger.error(
-        #         f"[{datetime.now()}] Failed to save final aggregated results: {str(e)}")
+        #         f"Failed to save final aggregated results: {str(e)}")
 
         return final_results
 
     except Exception as e:
-        logger.critical(
-            f"[{datetime.now()}] Critical error in process_people_direct: {str(e)}")
-        traceback.print_exc()
+        logger.critical("Critical error in process_people_direct: %s", e, exc_info=True)
         return []
     finally:
         await cleanup_old_debug_logs()
@@ -800,10 +846,9 @@ async def process_people(json_file_path: str, query: str, reasoning_model: str =
     """Process all people in batches with asyncio tasks."""
     try:
         start_time = time.time()
-        logger.info(f"[{datetime.now()}] Starting processing...")
+        logger.info("Starting processing...")
 
-        async with aiofiles.open(json_file_path, 'r') as f:
-            data = json.loads(await f.read())
+        data = orjson.loads(await asyncio.to_thread(_read_file_bytes, json_file_path))
 
         fingerprint_mapper = FingerprintMapper()
 
@@ -811,46 +856,68 @@ async def process_people(json_file_path: str, query: str, reasoning_model: str =
         people_to_process = data.get("result", [])[:5]
         total_people = len(people_to_process)
 
-        batches = await chunk_list(people_to_process, batch_size)
+        batches = chunk_list(people_to_process, batch_size)
+        # Query, HyDE XML and date are identical for every batch; only the persons XML varies
+        batch_prompt_template = build_batch_prompt_template(query, hyde_analysis_flags)
 
-        # Process batches with asyncio.gather and semaphore for concurrency control
+        # Batches run in a TaskGroup as in process_people_direct; the semaphore caps in-flight
+        # completions and results are slotted by batch index
         sem = asyncio.Semaphore(max_concurrent_tasks)
 
-        async def process_batch_with_semaphore(batch):
-            async with sem:
-                return await process_batch(batch, query, fingerprint_mapper, hyde_analysis_flags=hyde_analysis_flags, max_retries=max_retries, reasoning_model=reasoning_model)
+        batch_results: List[List[Dict]] = [[] for _ in batches]
+
+        async def process_batch_with_semaphore(index, batch):
+            try:
+                batch_results[index] = await process_batch(batch, query, fingerprint_mapper, hyde_analysis_flags=hyde_analysis_flags, max_retries=max_retries, reasoning_model=reasoning_model, prompt_template=batch_prompt_template, llm_semaphore=sem)
+            except Exception as e:
+                logger.exception("Batch processing failed: %s", e)
 
-        tasks = [process_batch_with_semaphore(batch) for batch in batches]
-        batch_results = await asyncio.gather(*tasks, return_exceptions=True)
+        async with asyncio.TaskGroup() as task_group:
+            for i, batch in enumerate(batches):
+                task_group.create_task(process_batch_with_semaphore(i, batch))
 
-        results = []
-        for batch_result in batch_results:
-            if isinstance(batch_result, Exception):
-                logger.error(f"Batch processing failed: {str(batch_result)}")
-                continue
-            results.extend(batch_result)
+        results = [result for batch_result in batch_results for result in batch_result]
 
-        return sorted(results, key=lambda x: x.get('recommendationScore', 0), reverse=True)
+        return sorted(results, key=recommendation_score_key, reverse=True)
 
     finally:
         # Cleanup old debug logs if needed
         await cleanup_old_debug_logs()
 
 
+# Local file I/O (script entry points and the commented debug dumps) goes through
+# asyncio.to_thread directly; aiofiles would only wrap the same thread-pool dispatch,
+# once per open/read/write call
+def _read_file_bytes(path: str) -> bytes:
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def _write_file_bytes(path: str, body: bytes) -> None:
+    with open(path, 'wb') as f:
+        f.write(body)
+
+
+def _remove_old_files(folder: str, cutoff: float) -> None:
+    # scandir entries carry the file type from the directory listing, and each is stat'ed once
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            try:
+                if entry.is_file() and entry.stat().st_mtime < cutoff:
+                    os.unlink(entry.path)
+            except OSError as e:
+                logger.error(f"Failed to remove old log file {entry.path}: {e}")
+
+
 async def cleanup_old_debug_logs(max_age_days: int = 7):
     """Clean up debug logs older than specified days."""
     debug_folder = "debug_logs"
-    if not os.path.exists(debug_folder):
+    # Deployed functions have no debug folder, so only that case pays for a worker thread
+    if not os.path.isdir(debug_folder):
         return
 
-    current_time = time.time()
-    for filename in os.listdir(debug_folder):
-        filepath = os.path.join(debug_folder, filename)
-        if os.path.getmtime(filepath) < current_time - (max_age_days * 86400):
-            try:
-                os.remove(filepath)
-            except Exception as e:
-                logger.error(f"Failed to remove old log file {filepath}: {e}")
+    cutoff = time.time() - (max_age_days * 86400)
+    await asyncio.to_thread(_remove_old_files, debug_folder, cutoff)
 
 if __name__ == "__main__":
     async def main():
@@ -891,8 +958,7 @@ if __name__ == "__main__":
         total_time = time.time() - start_time
 
         # Save sorted results
-        async with aiofiles.open('rerank_results_new_gemini.json', 'w') as f:
-            await f.write(json.dumps(results, indent=2))
+        await asyncio.to_thread(_write_file_bytes, 'rerank_results_new_gemini.json', orjson.dumps(results, option=orjson.OPT_INDENT_2))
 
         logger.info(f"Processed {len(results)} people")
         logger.info("Results saved to rerank_results_new_gemini.json")
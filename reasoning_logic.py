@@ -1,20 +1,38 @@
 # right side bar insights v15
 import traceback
 from datetime import datetime
-from api_client import get_node_document, SearchServiceError
+from api_client import fetch_nodes_by_ids_cached, get_node_document, SearchServiceError
 from ranking import convert_hyde_details_to_xml
 from jsonToXml import json_to_xml
-from prompts.sidebar_reasoning import message as search_reasoning_prompt, prefill, stop_sequences
-from llm_helper import LLMManager
+from prompts import sidebar_reasoning
+from prompts.template import PromptTemplate
+from prompts.sidebar_reasoning import prefill, stop_sequences
+from llm_helper import get_llm_manager
 from logging_config import setup_logger
 
 logger = setup_logger(__name__)
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Union
 import xml.etree.ElementTree as ET
 import re
 import json
 
 import asyncio
+from contextlib import asynccontextmanager
+
+# Patterns for parsing reasoning responses, compiled once rather than on every parse call
+_OUTPUT_TAGS_PATTERN = re.compile('<output>(.*?)</output>', re.DOTALL)
+_CHILD_TAG_PATTERN = re.compile(r'<(\w+)>(.*?)</\1>', re.DOTALL)
+_TITLE_PATTERN = re.compile(r'<title>(.*?)</title>', re.DOTALL)
+_RATING_PATTERN = re.compile(r'<rating>(.*?)</rating>', re.DOTALL)
+_KEY_POINTS_PATTERN = re.compile(r'<keyPoints>(.*?)</keyPoints>', re.DOTALL)
+_POINT_PATTERN = re.compile(r'<point>(.*?)</point>', re.DOTALL)
+_ROLE_FIT_PATTERN = re.compile(r'<roleFitIndicator>(.*?)</roleFitIndicator>')
+_ROLE_INDICATORS_PATTERN = re.compile(r'<roleIndicators>(.*?)</roleIndicators>', re.DOTALL)
+_INDICATOR_PATTERN = re.compile(r'<indicator>(.*?)</indicator>', re.DOTALL)
+_INSIGHTS_PATTERN = re.compile(r'<insights>(.*?)</insights>', re.DOTALL)
+_INSIGHT_PATTERN = re.compile(r'<insight>(.*?)</insight>', re.DOTALL)
+_WHITESPACE_PATTERN = re.compile(r'\s+')
+
 
 class SearchReasoningParser:
     @staticmethod
@@ -22,8 +40,11 @@ class SearchReasoningParser:
         """Extract content between specified tags"""
         try:
             # Find the last instance of output tags (in case there are multiple)
-            matches = list(re.finditer(
-                f'{start_tag}(.*?){end_tag}', text, re.DOTALL))
+            if start_tag == "<output>" and end_tag == "</output>":
+                pattern = _OUTPUT_TAGS_PATTERN
+            else:
+                pattern = re.compile(f'{start_tag}(.*?){end_tag}', re.DOTALL)
+            matches = list(pattern.finditer(text))
             if matches:
                 return matches[-1].group(1).strip()
             return text.strip()
@@ -38,8 +59,7 @@ class SearchReasoningParser:
         try:
             result = {}
             # Find all direct child tags
-            tag_matches = re.finditer(
-                r'<(\w+)>(.*?)</\1>', insight_text, re.DOTALL)
+            tag_matches = _CHILD_TAG_PATTERN.finditer(insight_text)
             for match in tag_matches:
                 tag_name, tag_content = match.groups()
                 result[tag_name] = tag_content.strip()
@@ -59,23 +79,19 @@ class SearchReasoningParser:
             }
 
             # Parse title
-            title_match = re.search(
-                r'<title>(.*?)</title>', indicator_text, re.DOTALL)
+            title_match = _TITLE_PATTERN.search(indicator_text)
             if title_match:
                 result["title"] = title_match.group(1).strip()
 
             # Parse rating
-            rating_match = re.search(
-                r'<rating>(.*?)</rating>', indicator_text, re.DOTALL)
+            rating_match = _RATING_PATTERN.search(indicator_text)
             if rating_match:
                 result["rating"] = rating_match.group(1).strip()
 
             # Parse keyPoints
-            key_points_match = re.search(
-                r'<keyPoints>(.*?)</keyPoints>', indicator_text, re.DOTALL)
+            key_points_match = _KEY_POINTS_PATTERN.search(indicator_text)
             if key_points_match:
-                points = re.finditer(
-                    r'<point>(.*?)</point>', key_points_match.group(1), re.DOTALL)
+                points = _POINT_PATTERN.finditer(key_points_match.group(1))
                 result["keyPoints"] = [point.group(
                     1).strip() for point in points]
 
@@ -98,17 +114,14 @@ class SearchReasoningParser:
             }
 
             # Parse roleFitIndicator
-            role_fit_match = re.search(
-                r'<roleFitIndicator>(.*?)</roleFitIndicator>', metadata_content)
+            role_fit_match = _ROLE_FIT_PATTERN.search(metadata_content)
             if role_fit_match:
                 metadata["roleFitIndicator"] = role_fit_match.group(1).strip()
 
             # Parse roleIndicators
-            role_indicators_match = re.search(
-                r'<roleIndicators>(.*?)</roleIndicators>', metadata_content, re.DOTALL)
+            role_indicators_match = _ROLE_INDICATORS_PATTERN.search(metadata_content)
             if role_indicators_match:
-                indicators = re.finditer(
-                    r'<indicator>(.*?)</indicator>', role_indicators_match.group(1), re.DOTALL)
+                indicators = _INDICATOR_PATTERN.finditer(role_indicators_match.group(1))
                 for indicator in indicators:
                     parsed_indicator = SearchReasoningParser.parse_role_indicator(
                         indicator.group(1))
@@ -130,12 +143,23 @@ class SearchReasoningParser:
             # Clean up whitespace while preserving sentence structure
             cleaned = explanation_content.strip()
             # Replace multiple whitespace with single space
-            cleaned = re.sub(r'\s+', ' ', cleaned)
+            cleaned = _WHITESPACE_PATTERN.sub(' ', cleaned)
             return cleaned
         except Exception as e:
             logger.error(f"Error parsing explanation: {str(e)}")
             return ""
 
+    @staticmethod
+    def empty_result() -> Dict[str, Any]:
+        """Fresh result for output that carries no insights or metadata"""
+        return {
+            "insights": [],
+            "metadata": {
+                "roleFitIndicator": None,
+                "roleIndicators": []
+            }
+        }
+
     def parse_output(self, content: str) -> Dict[str, Any]:
         """Parse the entire output content into a structured dictionary"""
         try:
@@ -145,6 +169,12 @@ class SearchReasoningParser:
             if not output_content:
                 raise ValueError("No content to parse after extraction")
 
+            # Output with none of the tags the result is built from (e.g. a refusal) parses to
+            # the empty result; substring checks settle that before any regex work
+            if ("<insight>" not in output_content and "<indicator>" not in output_content
+                    and "<roleFitIndicator>" not in output_content):
+                return self.empty_result()
+
             # Initialize result structure
             result = {
                 "insights": [],
@@ -155,20 +185,19 @@ class SearchReasoningParser:
             }
 
             # Extract major sections using regex
-            insights_match = re.search(
-                r'<insights>(.*?)</insights>', output_content, re.DOTALL)
+            insights_match = _INSIGHTS_PATTERN.search(output_content)
 
             # Process insights
             if insights_match:
-                insights = re.finditer(
-                    r'<insight>(.*?)</insight>', insights_match.group(1), re.DOTALL)
+                insights = _INSIGHT_PATTERN.finditer(insights_match.group(1))
                 for insight in insights:
                     parsed_insight = self.parse_insight(insight.group(1))
                     if parsed_insight:
                         result["insights"].append(parsed_insight)
 
             # Process metadata directly from output content since roleIndicators is at root level
-            result["metadata"] = self.parse_metadata(output_content)
+            if "<roleFitIndicator>" in output_content or "<indicator>" in output_content:
+                result["metadata"] = self.parse_metadata(output_content)
 
             logger.debug(
                 f"Successfully parsed output with {len(result['insights'])} insights")
@@ -176,25 +205,37 @@ class SearchReasoningParser:
 
         except Exception as e:
             logger.error(f"Error in parse_output: {str(e)}")
-            return {
-                "insights": [],
-                "metadata": {
-                    "roleFitIndicator": None,
-                    "roleIndicators": []
-                }
-            }
+            return self.empty_result()
 
 
 class SearchReasoning:
-    def __init__(self, max_concurrent_calls: int = 5):
-        self.llm = LLMManager()
+    def __init__(self, max_concurrent_calls: int = 5, max_concurrent_io: int = 10):
+        self.llm = get_llm_manager()
         self.parser = SearchReasoningParser()
         self.max_concurrent_calls = max_concurrent_calls
-        self.semaphore = None  # Will be initialized in batch_analyze_profiles
+        self.max_concurrent_io = max_concurrent_io
+        self._io_semaphore: Optional[asyncio.Semaphore] = None  # Initialized in batch_analyze_profiles
+        # Admission control: at most max_concurrent_calls LLM calls in flight. A Condition over a
+        # counter (rather than a Semaphore) lets set_concurrency resize the limit mid-batch
+        self._admission: Optional[asyncio.Condition] = None  # Initialized in batch_analyze_profiles
+        self._active_calls = 0
         logger.info(
             f"Initialized SearchReasoning with max_concurrent_calls: {max_concurrent_calls}")
 
-    async def analyze_profile(self, profile_xml: str, query: str, model: str = "groq_deepseek", hyde_analysis_flags: Dict[str, Any] = None) -> Dict[str, Any]:
+    @staticmethod
+    def build_prompt_template(query: str, hyde_analysis_flags: Optional[Dict[str, Any]]) -> PromptTemplate:
+        """Reasoning prompt with everything but the per-profile XML filled in."""
+        # Convert hyde analysis flags to XML if provided
+        hyde_analysis_xml = convert_hyde_details_to_xml(
+            hyde_analysis_flags) if hyde_analysis_flags else "<hyde_analysis />"
+        return sidebar_reasoning.template.partial(
+            QUERY=query,
+            HYDE_ANALYSIS_XML=hyde_analysis_xml,
+            CURRENT_DATE=datetime.now().strftime("%Y-%m-%d"),
+        )
+
+    async def analyze_profile(self, profile_xml: str, query: str, model: str = "groq_deepseek", hyde_analysis_flags: Dict[str, Any] = None,
+                              prompt_template: Optional[PromptTemplate] = None) -> Dict[str, Any]:
         """
         Analyze profile using LiteLLM and search reasoning prompt
 
@@ -203,18 +244,17 @@ class SearchReasoning:
             query (str): The search query
             model (str): The model to use for generation. Defaults to "groq_deepseek"
             hyde_analysis_flags (Dict[str, Any]): Pre-analyzed query criteria from Hyde
+            prompt_template (PromptTemplate): Prompt with query, Hyde XML and date already
+                filled in (see build_prompt_template); built here when not supplied
         """
         try:
             logger.info(f"Starting profile analysis using model: {model}")
 
-            # Convert hyde analysis flags to XML if provided
-            hyde_analysis_xml = convert_hyde_details_to_xml(
-                hyde_analysis_flags) if hyde_analysis_flags else "<hyde_analysis />"
-
-            # Replace placeholders in prompt with actual values
-            current_date = datetime.now().strftime("%Y-%m-%d")
-            prompt = search_reasoning_prompt.replace("{{PROFILE_XML}}", profile_xml).replace(
-                "{{QUERY}}", query).replace("{{HYDE_ANALYSIS_XML}}", hyde_analysis_xml).replace("{{CURRENT_DATE}}", current_date)
+            if prompt_template is None:
+                prompt_template = self.build_prompt_template(query, hyde_analysis_flags)
+            # The profile sits last in the prompt, so everything before it (instructions, query,
+            # Hyde XML, date) is constant for the search and is marked for provider prompt caching
+            prompt_prefix, prompt_rest = prompt_template.render_split(PROFILE_XML=profile_xml)
 
             # Store prompt locally for debugging
             # try:
@@ -229,15 +269,22 @@ class SearchReasoning:
             response = await self.llm.get_completion(
                 provider=model,
                 messages=[
-                    {"role": "user", "content": prompt},
+                    {"role": "user", "content": [
+                        {"type": "text", "text": prompt_prefix, "cache_control": {"type": "ephemeral"}},
+                        {"type": "text", "text": prompt_rest},
+                    ]},
                     {"role": "assistant", "content": prefill}
                 ],
                 stop=stop_sequences,
             )
 
-            # Parse the response
-            output_text = response.choices[0].message.content + \
-                stop_sequences[0]
+            # Parse the response. Providers that honour the assistant prefill continue after it,
+            # so their text lacks the opening tag; re-adding it (and the stop sequence, which is
+            # never returned) yields a complete <output> block for extract_between_tags
+            content = response.choices[0].message.content
+            if prefill not in content:
+                content = prefill + content
+            output_text = content + stop_sequences[0]
             result = self.parser.parse_output(output_text)
             logger.info(
                 f"Successfully completed profile analysis with model: {model}")
@@ -248,67 +295,101 @@ class SearchReasoning:
                 f"Error analyzing profile with model {model}: {str(e)}")
             raise
 
-    async def process_single_node(self, node: Dict[str, Any], query: str, model: str = "gemini", hyde_analysis_flags: Dict[str, Any] = None) -> Dict[str, Any]:
+    async def set_concurrency(self, max_concurrent_calls: int) -> None:
+        """Change the in-flight limit at runtime, e.g. to back off after provider rate limits."""
+        self.max_concurrent_calls = max(1, max_concurrent_calls)
+        if self._admission is not None:
+            async with self._admission:
+                self._admission.notify_all()
+
+    @asynccontextmanager
+    async def _admitted(self):
+        """Hold one of the max_concurrent_calls slots for the duration of the block."""
+        async with self._admission:
+            await self._admission.wait_for(lambda: self._active_calls < self.max_concurrent_calls)
+            self._active_calls += 1
+        try:
+            yield
+        finally:
+            async with self._admission:
+                self._active_calls -= 1
+                self._admission.notify(1)
+
+    @staticmethod
+    def _node_id(node: Union[str, Dict[str, Any]]) -> Optional[str]:
+        """Nodes may be passed as bare nodeId strings or as ``{"nodeId": ...}`` dicts."""
+        return node if isinstance(node, str) else node.get('nodeId')
+
+    async def process_single_node(self, node: Union[str, Dict[str, Any]], query: str, model: str = "gemini", hyde_analysis_flags: Dict[str, Any] = None,
+                                  prompt_template: Optional[PromptTemplate] = None,
+                                  node_data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
-        Process a single node with semaphore control
+        Process a single node; its data fetch and LLM call are bounded by separate limits
 
         Args:
-            node (Dict[str, Any]): The node data to process
+            node (Union[str, Dict[str, Any]]): The nodeId, or node data carrying a nodeId
             query (str): The search query
             model (str): The model to use for generation. Defaults to "groq_deepseek"
             hyde_analysis_flags (Dict[str, Any]): Pre-analyzed query criteria from Hyde
+            prompt_template (PromptTemplate): Shared prompt from build_prompt_template
+            node_data (Dict[str, Any]): Node document already fetched in bulk; fetched here if absent
         """
-        async with self.semaphore:
-            try:
-                node_id = node.get('nodeId')
-                if not node_id:
-                    logger.error("Missing nodeId in node data")
-                    return {'error': 'Missing nodeId'}
-
-                # Fetch node data from API
+        node_id = self._node_id(node)
+        try:
+            if not node_id:
+                logger.error("Missing nodeId in node data")
+                return {'error': 'Missing nodeId'}
+
+            # Fetch node data from API; the client is blocking, so it runs on a worker
+            # thread rather than stalling every other node's LLM call on the event loop.
+            # Data-service fetches have their own limit so they never occupy an LLM slot
+            if node_data is None:
                 try:
-                    node_data = get_node_document(node_id)
+                    async with self._io_semaphore:
+                        node_data = await asyncio.to_thread(get_node_document, node_id)
                 except SearchServiceError as exc:
                     logger.error("Node fetch failed for %s: %s", node_id, exc)
                     node_data = None
 
-                if not node_data:
-                    logger.warning(f"Node not found in data service: {node_id}")
-                    return {
-                        'nodeId': node_id,
-                        'error': 'Node not found in data service'
-                    }
+            if not node_data:
+                logger.warning(f"Node not found in data service: {node_id}")
+                return {
+                    'nodeId': node_id,
+                    'error': 'Node not found in data service'
+                }
 
-                # Convert node data to XML
-                try:
-                    node_xml = json_to_xml(node_data)
-                except Exception as xml_error:
-                    logger.error(
-                        f"XML conversion error for node {node_id}: {str(xml_error)}")
-                    return {
-                        'nodeId': node_id,
-                        'error': f'XML conversion error: {str(xml_error)}'
-                    }
-
-                # Analyze profile with specified model and hyde analysis
-                analysis_result = await self.analyze_profile(node_xml, query, model, hyde_analysis_flags)
-                analysis_result['nodeId'] = node_id
-                return analysis_result
-
-            except Exception as e:
+            # Convert node data to XML
+            try:
+                node_xml = json_to_xml(node_data)
+            except Exception as xml_error:
                 logger.error(
-                    f"Unexpected error processing node {node.get('nodeId')}: {str(e)}")
+                    f"XML conversion error for node {node_id}: {str(xml_error)}")
                 return {
-                    'nodeId': node.get('nodeId'),
-                    'error': f'Unexpected error: {str(e)}'
+                    'nodeId': node_id,
+                    'error': f'XML conversion error: {str(xml_error)}'
                 }
 
-    async def batch_analyze_profiles(self, nodes: List[Dict[str, Any]], query: str, model: str = "gemini", hyde_analysis_flags: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+            # Analyze profile with specified model and hyde analysis; admission control
+            # bounds only the LLM call
+            async with self._admitted():
+                analysis_result = await self.analyze_profile(node_xml, query, model, hyde_analysis_flags, prompt_template)
+            analysis_result['nodeId'] = node_id
+            return analysis_result
+
+        except Exception as e:
+            logger.error(
+                f"Unexpected error processing node {node_id}: {str(e)}")
+            return {
+                'nodeId': node_id,
+                'error': f'Unexpected error: {str(e)}'
+            }
+
+    async def batch_analyze_profiles(self, nodes: List[Union[str, Dict[str, Any]]], query: str, model: str = "gemini", hyde_analysis_flags: Dict[str, Any] = None) -> List[Dict[str, Any]]:
         """
         Process multiple nodes concurrently with controlled parallelism
 
         Args:
-            nodes (List[Dict[str, Any]]): List of nodes to process
+            nodes (List[Union[str, Dict[str, Any]]]): nodeIds or node dicts to process
             query (str): The search query
             model (str): The model to use for generation. Defaults to "groq_deepseek"
             hyde_analysis_flags (Dict[str, Any]): Pre-analyzed query criteria from Hyde
@@ -316,14 +397,74 @@ class SearchReasoning:
         try:
             logger.info(
                 f"Starting batch analysis of {len(nodes)} nodes using model: {model}")
-            self.semaphore = asyncio.Semaphore(self.max_concurrent_calls)
-
-            # Create tasks for all nodes with the specified model and hyde analysis
-            tasks = [self.process_single_node(
-                node, query, model, hyde_analysis_flags) for node in nodes]
+            self._admission = asyncio.Condition()
+            self._active_calls = 0
+            self._io_semaphore = asyncio.Semaphore(self.max_concurrent_io)
+
+            # One completion per node, bounded by admission control. Provider Batch APIs are not used:
+            # they complete asynchronously (up to 24h), which cannot serve a synchronous invocation.
+            # Tasks are created through a bounded window rather than all up front, so at most
+            # `backlog_limit` nodes are in flight; it leaves room for both the data-service and
+            # the LLM stage to run at their limits
+            backlog_limit = self.max_concurrent_calls + self.max_concurrent_io
+            # Query, Hyde XML and date are identical for every node; only the profile XML varies
+            prompt_template = self.build_prompt_template(query, hyde_analysis_flags)
+
+            async def prefetch(window: List[Union[str, Dict[str, Any]]]) -> Dict[str, Dict[str, Any]]:
+                """Bulk-fetch the window's distinct nodes; misses fall back to a single fetch
+                inside process_single_node"""
+                window_ids = list(dict.fromkeys(
+                    str(node_id) for node_id in map(self._node_id, window) if node_id))
+                if not window_ids:
+                    return {}
+                try:
+                    return await asyncio.to_thread(fetch_nodes_by_ids_cached, window_ids)
+                except SearchServiceError as exc:
+                    logger.error("Bulk node fetch failed, fetching nodes individually: %s", exc)
+                    return {}
+
+            # Documents are prefetched one window of `backlog_limit` nodes at a time, so together
+            # with the documents held by in-flight tasks at most two windows are resident
+            node_docs: Dict[str, Dict[str, Any]] = {}
+            results: List[Optional[Dict[str, Any]]] = [None] * len(nodes)
+            pending: Dict[asyncio.Task, int] = {}
+
+            async def drain(return_when: str) -> None:
+                done, _ = await asyncio.wait(pending, return_when=return_when)
+                for task in done:
+                    index = pending.pop(task)
+                    # A failure in one node must not discard the results produced for the others
+                    error = task.exception()
+                    if error is not None:
+                        logger.error(
+                            f"Unhandled error processing node {self._node_id(nodes[index])}: {str(error)}")
+                        results[index] = {
+                            'nodeId': self._node_id(nodes[index]),
+                            'error': f'Unexpected error: {str(error)}'
+                        }
+                    else:
+                        results[index] = task.result()
 
-            # Execute tasks concurrently and gather results
-            results = await asyncio.gather(*tasks)
+            try:
+                for index, node in enumerate(nodes):
+                    if len(pending) >= backlog_limit:
+                        await drain(asyncio.FIRST_COMPLETED)
+                    if index % backlog_limit == 0:
+                        node_docs = await prefetch(nodes[index:index + backlog_limit])
+                    node_id = self._node_id(node)
+                    task = asyncio.create_task(self.process_single_node(
+                        node, query, model, hyde_analysis_flags, prompt_template,
+                        node_docs.get(str(node_id)) if node_id else None))
+                    pending[task] = index
+                while pending:
+                    await drain(asyncio.ALL_COMPLETED)
+            finally:
+                # If the window loop raised or was cancelled, the tasks it started are cancelled
+                # and awaited here rather than left running against this loop
+                for task in pending:
+                    task.cancel()
+                if pending:
+                    await asyncio.gather(*pending, return_exceptions=True)
             logger.info(
                 f"Completed batch analysis of {len(results)} nodes using model: {model}")
             return results
@@ -1,21 +1,45 @@
 import functools
 import asyncio
-from typing import Any, Callable, Dict, List, TypeVar, Union
+import random
+from typing import Any, Callable, Dict, List, Optional, TypeVar, Union
 from logging_config import setup_logger
 
 logger = setup_logger(__name__)
 
 T = TypeVar('T', Dict[str, Any], List[Dict[str, Any]])
 
-def retry_on_empty_result(max_retries: int = 3) -> Callable:
+# Retry delays grow exponentially from the base, with jitter, capped at the maximum
+RETRY_BASE_DELAY_SECONDS = 0.1
+RETRY_MAX_DELAY_SECONDS = 5.0
+
+
+def _retry_delay(attempt: int) -> float:
+    """Exponential backoff with jitter so concurrent retries do not hit the provider in lockstep."""
+    return min(RETRY_BASE_DELAY_SECONDS * (2 ** attempt) + random.random() * RETRY_BASE_DELAY_SECONDS,
+               RETRY_MAX_DELAY_SECONDS)
+
+
+def _is_empty_result(result: Any) -> bool:
+    """Default emptiness test: an empty list, or a dict whose values are all falsy."""
+    if isinstance(result, dict):
+        return not result or not any(result.values())
+    return isinstance(result, list) and not result
+
+
+def retry_on_empty_result(max_retries: int = 3, is_empty: Optional[Callable[[Any], bool]] = None) -> Callable:
     """
     A decorator that retries the function if it returns an empty result.
     Works with both dict and list return types.
     First tries with original model for max_retries, then switches to anthropic_haiku for additional retries.
+    Retries back off exponentially; callers holding a concurrency slot should release it
+    inside the decorated function so the slot is not held across the delay.
     
     Args:
         max_retries (int): Maximum number of retry attempts per model
+        is_empty (Callable[[Any], bool]): Optional predicate replacing the default emptiness check
     """
+    check_empty = is_empty or _is_empty_result
+
     def decorator(func: Callable[..., T]) -> Callable[..., T]:
         @functools.wraps(func)
         async def wrapper(*args, **kwargs) -> T:
@@ -24,29 +48,23 @@ def retry_on_empty_result(max_retries: int = 3) -> Callable:
                 try:
                     result = await func(*args, **kwargs)
                     
-                    # Check if result is empty based on its type
-                    is_empty = False
-                    if isinstance(result, dict):
-                        is_empty = not any(result.values())
-                    elif isinstance(result, list):
-                        is_empty = len(result) == 0
-                    else:
+                    if not isinstance(result, (dict, list)):
                         logger.warning(f"Unexpected result type: {type(result)}")
                         return result
                     
-                    if not is_empty:
+                    if not check_empty(result):
                         return result
                     
                     if attempt < max_retries - 1:
                         logger.warning(f"Empty result on attempt {attempt + 1}, retrying...")
-                        await asyncio.sleep(1)  # Add a small delay between retries
+                        await asyncio.sleep(_retry_delay(attempt))
                     else:
                         logger.warning(f"All {max_retries} attempts with original model returned empty results, switching to anthropic_haiku")
                         
                 except Exception as e:
                     if attempt < max_retries - 1:
                         logger.warning(f"Error on attempt {attempt + 1}: {str(e)}, retrying...")
-                        await asyncio.sleep(1)
+                        await asyncio.sleep(_retry_delay(attempt))
                     else:
                         logger.warning(f"All {max_retries} attempts with original model failed, switching to anthropic_haiku")
 
@@ -60,19 +78,12 @@ def retry_on_empty_result(max_retries: int = 3) -> Callable:
                     try:
                         result = await func(*args, **kwargs)
                         
-                        # Check if result is empty
-                        is_empty = False
-                        if isinstance(result, dict):
-                            is_empty = not any(result.values())
-                        elif isinstance(result, list):
-                            is_empty = len(result) == 0
-                        
-                        if not is_empty:
+                        if not check_empty(result):
                             return result
                         
                         if attempt < max_retries - 1:
                             logger.warning(f"Empty result with anthropic_haiku on attempt {attempt + 1}, retrying...")
-                            await asyncio.sleep(1)
+                            await asyncio.sleep(_retry_delay(attempt))
                         else:
                             logger.error(f"All {max_retries} attempts with anthropic_haiku returned empty results")
                             # Reset model name before returning
@@ -82,7 +93,7 @@ def retry_on_empty_result(max_retries: int = 3) -> Callable:
                     except Exception as e:
                         if attempt < max_retries - 1:
                             logger.warning(f"Error with anthropic_haiku on attempt {attempt + 1}: {str(e)}, retrying...")
-                            await asyncio.sleep(1)
+                            await asyncio.sleep(_retry_delay(attempt))
                         else:
                             logger.error(f"All {max_retries} attempts with anthropic_haiku failed with error: {str(e)}")
                             # Reset model name before returning
@@ -3,19 +3,109 @@
 Test script for the Reasoning Lambda function
 """
 import argparse
-import json
-from dotenv import load_dotenv
+import os
+import sys
+import time
+import orjson
 from logging_config import setup_logger
-from lambda_handler import lambda_handler
-from api_client import get_search_document
 
 DEFAULT_USER_ID = "6797bf304791caa516f6da9e"
+DEFAULT_FUNCTION_NAME = "lambda-search-rank-and-reasoning"
+POLL_INTERVAL_SECONDS = 2
+# Statuses the handler accepts (its _READY_STATUSES); any other status is rejected without a write
+READY_STATUSES = {"SEARCH_COMPLETE", "RANK_AND_REASONING_COMPLETE"}
+# Only the fields validated below, so the check does not download the full search document.
+# Reasoning is checked for presence only: the handler always writes reasoning.metadata and a
+# summary key on every candidate reasoning entry, so those stand in for the full blocks
+VALIDATION_PROJECTION = {
+    "status": 1,
+    "results.candidates.nodeId": 1,
+    "results.candidates.score": 1,
+    "results.candidates.reasoning.summary": 1,
+    "reasoning.metadata": 1,
+}
+
+
+def fetch_validation_fields(search_id, user_id):
+    """Fetch only the validated fields of the search document."""
+    from api_client import get_search_document
+    return get_search_document(search_id, user_id=user_id, projection=VALIDATION_PROJECTION)
+
+
+def invoke_sync(event):
+    """Run the handler in-process and return its response dict."""
+    from lambda_handler import lambda_handler
+    return lambda_handler(event, None)
+
+
+def submit_async(event, function_name):
+    """Queue the event on the deployed function; the call returns once Lambda accepts it."""
+    import boto3
+    response = boto3.client("lambda").invoke(
+        FunctionName=function_name,
+        InvocationType="Event",
+        Payload=orjson.dumps(event),
+    )
+    return {"statusCode": response.get("StatusCode"), "body": {"requestId": response["ResponseMetadata"].get("RequestId")}}
+
+
+def preflight(search_id, user_id, candidate_ids=None):
+    """Reject runs the handler would skip without writing anything; returns the document.
+
+    An asynchronous invocation's early responses are never seen, so without this check the
+    script would poll until the timeout for a write that never happens.
+    """
+    from api_client import get_search_document
+    doc = get_search_document(
+        search_id,
+        user_id=user_id,
+        projection={"status": 1, "query": 1, "updatedAt": 1, "results.candidates.nodeId": 1},
+    )
+    if not doc:
+        problem = "search document not found"
+    elif doc.get("status") and doc.get("status") not in READY_STATUSES:
+        problem = f"search is not ready for ranking (status: {doc.get('status')})"
+    elif not doc.get("query"):
+        problem = "search document missing query text"
+    elif not (doc.get("results") or {}).get("candidates"):
+        problem = "no candidates available in search results"
+    elif candidate_ids and not set(candidate_ids) & {
+        c.get("nodeId") for c in doc["results"]["candidates"] if c.get("nodeId")
+    }:
+        problem = "none of the requested candidateIds are in the search results"
+    else:
+        return doc
+    print(f"[ERROR] Not submitting {search_id}: {problem}")
+    raise SystemExit(1)
+
+
+def wait_for_completion(search_id, user_id, previous_updated_at, timeout_seconds):
+    """Poll the search document until this run writes to it; exit 1 if it wrote ERROR.
+
+    Only a final batch (isFinalBatch) moves the status to RANK_AND_REASONING_COMPLETE; any
+    other successful run just refreshes updatedAt, so a changed updatedAt marks completion.
+    """
+    from api_client import get_search_document
+    deadline = time.monotonic() + timeout_seconds
+    while time.monotonic() < deadline:
+        doc = get_search_document(search_id, user_id=user_id, projection={"status": 1, "updatedAt": 1, "error": 1})
+        if doc and doc.get("updatedAt") != previous_updated_at:
+            if doc.get("status") == "ERROR":
+                print(f"[ERROR] Run failed: {(doc.get('error') or {}).get('message', 'unknown error')}")
+                raise SystemExit(1)
+            return doc.get("status")
+        time.sleep(POLL_INTERVAL_SECONDS)
+    print(f"[ERROR] Timed out after {timeout_seconds}s waiting for search {search_id}")
+    raise SystemExit(1)
 
-load_dotenv()
-logger = setup_logger(__name__)
 
 def main():
-    parser = argparse.ArgumentParser(description="Run RankAndReasoning Lambda locally")
+    # .env is loaded at run time rather than on import, before LAMBDA_FUNCTION_NAME is read below
+    from config import load_local_env
+    load_local_env()
+    setup_logger(__name__)
+
+    parser = argparse.ArgumentParser(description="Run the RankAndReasoning Lambda (deployed, asynchronously) or locally with --sync")
     parser.add_argument("--search-id", required=True, help="Existing searchId with SEARCH_COMPLETE status")
     parser.add_argument("--ranking", dest="ranking", action="store_true", help="Enable ranking")
     parser.add_argument("--no-ranking", dest="ranking", action="store_false", help="Disable ranking")
@@ -39,19 +129,49 @@ def main():
         default=DEFAULT_USER_ID,
         help="UserId associated with the search document"
     )
+    parser.add_argument(
+        "--sync",
+        action="store_true",
+        help="Call lambda_handler in-process instead of invoking the deployed function asynchronously"
+    )
+    parser.add_argument(
+        "--function-name",
+        type=str,
+        default=os.getenv("LAMBDA_FUNCTION_NAME", DEFAULT_FUNCTION_NAME),
+        help="Deployed Lambda function to invoke (ignored with --sync)"
+    )
+    parser.add_argument(
+        "--poll-timeout",
+        type=int,
+        default=900,
+        help="Seconds to wait for the asynchronous run to finish"
+    )
+    parser.add_argument(
+        "--verbose",
+        action="store_true",
+        help="Count every scored/reasoned candidate instead of stopping at the first of each"
+    )
+    parser.add_argument(
+        "--validate-only",
+        action="store_true",
+        help="Skip the invocation and only validate the search document left by a previous run"
+    )
     parser.set_defaults(ranking=True, reasoning=False)
     args = parser.parse_args()
 
     search_id = args.search_id
     candidate_ids = [cid.strip() for cid in args.candidate_ids.split(",") if cid.strip()]
     user_id = args.user_id
-    candidate_filter = set(candidate_ids) if candidate_ids else None
+    candidate_filter = frozenset(candidate_ids) if candidate_ids else None
 
-    print("🚀 Starting RankAndReasoning Lambda Test")
-    print(f"📌 Using searchId: {search_id}")
-    print(f"⚙️  Ranking: {args.ranking}, Reasoning: {args.reasoning}")
+    banner = [
+        "🚀 Starting RankAndReasoning Lambda Test",
+        f"📌 Using searchId: {search_id}",
+        f"⚙️  Ranking: {args.ranking}, Reasoning: {args.reasoning}",
+    ]
     if candidate_ids:
-        print(f"🎯 Candidate subset: {candidate_ids}")
+        banner.append(f"🎯 Candidate subset: {candidate_ids}")
+    sys.stdout.write("\n".join(banner) + "\n")
 
     event = {
         "searchId": search_id,
@@ -63,22 +183,32 @@ def main():
     if candidate_ids:
         event["candidateIds"] = candidate_ids
 
-    result = lambda_handler(event, None)
-    status = result.get("statusCode")
-    body_raw = result.get("body")
-    body = None
-    try:
-        body = json.loads(body_raw) if isinstance(body_raw, str) else body_raw
-    except Exception:
-        body = {"raw": body_raw}
+    if args.validate_only:
+        print("⏭️  Validate-only: skipping invocation, checking the existing search document")
+    else:
+        if args.sync:
+            result = invoke_sync(event)
+        else:
+            before = preflight(search_id, user_id, candidate_ids)
+            result = submit_async(event, args.function_name)
+            print(f"📨 Submitted to {args.function_name}, polling every {POLL_INTERVAL_SECONDS}s...")
+            wait_for_completion(search_id, user_id, before.get("updatedAt"), args.poll_timeout)
+        status = result.get("statusCode")
+        body_raw = result.get("body")
+        body = None
+        try:
+            body = orjson.loads(body_raw) if isinstance(body_raw, str) else body_raw
+        except Exception:
+            body = {"raw": body_raw}
 
-    print("\n=== Lambda Response ===")
-    print(f"Status Code: {status}\n")
-    print("Response Body:")
-    print(json.dumps(body, indent=2, default=str))
+        sys.stdout.write(
+            f"\n=== Lambda Response ===\nStatus Code: {status}\n\nResponse Body:\n"
+            + orjson.dumps(body, default=str, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS).decode()
+            + "\n"
+        )
 
     # Validate DB updates
-    doc = get_search_document(search_id, user_id=user_id)
+    doc = fetch_validation_fields(search_id, user_id)
     if not doc:
         print(f"[ERROR] Search document not found: {search_id}")
         raise SystemExit(1)
@@ -89,18 +219,38 @@ def main():
 
     # Validate candidate array produced by ranking step
     candidates = (doc.get("results") or {}).get("candidates") or []
+    # One pass counts both checks; with a candidate subset, stop once every id has been seen.
+    # Without --verbose only presence matters, so stop at the first hit for each enabled check
+    need_scored = args.ranking
+    need_reasoning = args.reasoning and bool(doc.get("reasoning"))
+    scored_count = reasoning_count = 0
+    remaining = set(candidate_filter) if candidate_filter else None
+    # Bound once; the set shrinks in place as ids are seen, so the bound method stays current
+    in_remaining = remaining.__contains__ if remaining is not None else None
+    for c in candidates:
+        node_id = c.get("nodeId")
+        if in_remaining is not None and not in_remaining(node_id):
+            continue
+        if c.get("score") is not None:
+            scored_count += 1
+        if c.get("reasoning"):
+            reasoning_count += 1
+        if remaining is not None:
+            remaining.discard(node_id)
+            if not remaining:
+                break
+        if not args.verbose and (scored_count or not need_scored) and (reasoning_count or not need_reasoning):
+            break
+
     if args.ranking:
         # Count candidates that have ranking scores (indicating ranking was performed)
-        scored_candidates = [
-            c for c in candidates
-            if c.get("score") is not None
-            and (candidate_filter is None or c.get("nodeId") in candidate_filter)
-        ]
-        if scored_candidates:
+        if scored_count and args.verbose:
             print(
-                f"   ✅ Ranking completed with {len(scored_candidates)} scored results "
+                f"   ✅ Ranking completed with {scored_count} scored results "
                 f"out of {len(candidate_filter) if candidate_filter else len(candidates)} candidates"
             )
+        elif scored_count:
+            print("   ✅ Ranking completed with scored results")
         else:
             print("   ❌ No scores found (ranking may have failed)")
             raise SystemExit(1)
@@ -110,13 +260,10 @@ def main():
     if args.reasoning:
         reasoning = doc.get("reasoning")
         if reasoning:
-            filtered = [
-                c for c in candidates
-                if c.get("reasoning")
-                and (candidate_filter is None or c.get("nodeId") in candidate_filter)
-            ]
-            if filtered:
-                print(f"   ✅ Reasoning results present for {len(filtered)} candidates")
+            if reasoning_count and args.verbose:
+                print(f"   ✅ Reasoning results present for {reasoning_count} candidates")
+            elif reasoning_count:
+                print("   ✅ Reasoning results present")
             else:
                 print("   ❌ Reasoning results missing")
                 raise SystemExit(1)